@@ -0,0 +1,204 @@
+# Flight path microbenchmark.
+#
+# Times moving a crowd of enemies spread over the original five paths for
+# a number of ticks, the way Enemy.update() used to (a branch per path and
+# math.sin(self.rect.x / 250) and friends per enemy per tick) against the
+# compiled step table lookup it uses now. The same comparison is made for
+# the NumPy enemy store: per-path masked trig against one table gather.
+#
+# Before timing, the compiled tables of the original five paths are checked
+# to give the exact same steps as the formulas they replaced, at every
+# column.
+#
+# Usage (from the project top level directory):
+#
+#   python bench/path_bench.py [--enemies N] [--ticks N] [--repeat N]
+
+#------------------------------
+# Imports
+#------------------------------
+import os          # Paths
+import sys         # Module search path
+import json        # Report output
+import math        # The original path formulas
+import timeit      # Timing
+import argparse    # Command line options
+
+# Run from the project top level directory, where the path file is relative to
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+os.chdir(ROOT_DIR)
+
+import pygame  # Import the pygame library
+import numpy   # Store-style batched movement
+from flight_paths import FlightPaths, FLIGHT_PATHS  # The path tables under test
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Defaults
+BENCH_ENEMIES = 500
+BENCH_TICKS = 100
+BENCH_REPEAT = 5
+
+# Columns covered by the tables (as in game.py)
+SCREEN_WIDTH = 1024
+PATH_MARGIN = 256
+
+# The original movement patterns and their formulas, by path name
+movement_pattern = ["LINEAR", "SINE", "COSINE", "RISE", "FALL"]
+ORIGINAL_PATHS = {
+   "LINEAR": lambda x: 0,
+   "SINE": lambda x: 5 * math.sin(x / 250),
+   "COSINE": lambda x: 5 * math.cos(x / 250),
+   "RISE": lambda x: -0.01 * x,
+   "FALL": lambda x: 0.01 * x
+}
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Stand-in for an Enemy with only what movement needs
+class Mover(object):
+   def __init__(self, x, y, speed, name, path):
+      self.rect = pygame.Rect(x, y, 36, 14)
+      self.speed = speed
+      self.name = name
+      self.path = path
+
+   # One tick the original way
+   def update_trig(self):
+      # Linear
+      if self.name == movement_pattern[0]:
+         self.rect.move_ip(-self.speed, 0)
+      # Sine Wave
+      elif self.name == movement_pattern[1]:
+         self.rect.move_ip(-self.speed, 5 * math.sin(self.rect.x / 250))
+      # Cosine Wave
+      elif self.name == movement_pattern[2]:
+         self.rect.move_ip(-self.speed, 5 * math.cos(self.rect.x / 250))
+      # Rising
+      elif self.name == movement_pattern[3]:
+         self.rect.move_ip(-self.speed, -0.01 * self.rect.x)
+      # Falling
+      elif self.name == movement_pattern[4]:
+         self.rect.move_ip(-self.speed, 0.01 * self.rect.x)
+      self.respawn()
+
+   # One tick with the compiled table
+   def update_table(self):
+      self.rect.move_ip(-self.speed, self.path.steps[self.rect.x])
+      self.respawn()
+
+   # Come back in from the right once past the left edge, like a new enemy
+   def respawn(self):
+      if self.rect.right < 0:
+         self.rect.x = SCREEN_WIDTH + 50
+
+#------------------------------
+# Functions
+#------------------------------
+
+# Check the compiled tables against the original formulas, returns the mismatching columns
+def check_paths(flight_paths):
+   mismatches = []
+   for name, formula in ORIGINAL_PATHS.items():
+      flight_path = flight_paths.get(name)
+      for x in range(flight_path.x_min, flight_path.x_max + 1):
+         # Rect.move_ip() truncates a fractional step toward zero
+         if flight_path.get_step(x) != int(formula(x)):
+            mismatches.append((name, x))
+   return mismatches
+
+# Build a crowd of movers spread across the screen and the original paths
+def make_movers(flight_paths, count):
+   movers = []
+   for i in range(count):
+      name = movement_pattern[i % len(movement_pattern)]
+      movers.append(Mover((i * 37) % (SCREEN_WIDTH + 100), (i * 53) % 700, 8 + (i % 13), name, flight_paths.get(name)))
+   return movers
+
+# Best time (ms) over the repeats of moving every mover for a number of ticks
+def time_moves(flight_paths, count, ticks, repeat, method):
+   def run():
+      movers = make_movers(flight_paths, count)
+      updates = [getattr(mover, method) for mover in movers]
+      for tick in range(ticks):
+         for update in updates:
+            update()
+   return min(timeit.repeat(run, number=1, repeat=repeat)) * 1000
+
+# Best time (ms) over the repeats of moving the same crowd as arrays, the way
+# the NumPy enemy store used to (trig) or does now (table)
+def time_batched(flight_paths, count, ticks, repeat, table):
+   movers = make_movers(flight_paths, count)
+   steps = numpy.array(flight_paths.get_table(), dtype=numpy.int64)
+   x_min = flight_paths.path_list[0].x_min
+
+   def run():
+      x = numpy.array([mover.rect.x for mover in movers], dtype=numpy.int64)
+      y = numpy.array([mover.rect.y for mover in movers], dtype=numpy.int64)
+      speed = numpy.array([mover.speed for mover in movers], dtype=numpy.int64)
+      path = numpy.array([mover.path.id for mover in movers], dtype=numpy.int64)
+      for tick in range(ticks):
+         x[(x + 36) < 0] = SCREEN_WIDTH + 50
+         if table == True:
+            dy = steps[path, numpy.clip(x - x_min, 0, steps.shape[1] - 1)]
+         else:
+            dy = numpy.zeros(count, dtype=numpy.float64)
+            sine = path == 1
+            dy[sine] = 5 * numpy.sin(x[sine] / 250)
+            cosine = path == 2
+            dy[cosine] = 5 * numpy.cos(x[cosine] / 250)
+            rise = path == 3
+            dy[rise] = -0.01 * x[rise]
+            fall = path == 4
+            dy[fall] = 0.01 * x[fall]
+            dy = numpy.trunc(dy).astype(numpy.int64)
+         x -= speed
+         y += dy
+   return min(timeit.repeat(run, number=1, repeat=repeat)) * 1000
+
+#------------------------------
+# Core Logic
+#------------------------------
+
+def main():
+   parser = argparse.ArgumentParser(description="Compare per-tick trig with compiled flight path tables.")
+   parser.add_argument("--enemies", type=int, default=BENCH_ENEMIES, help="enemies moved every tick")
+   parser.add_argument("--ticks", type=int, default=BENCH_TICKS, help="ticks per run")
+   parser.add_argument("--repeat", type=int, default=BENCH_REPEAT, help="runs to take the best time of")
+   args = parser.parse_args()
+
+   flight_paths = FlightPaths()
+   flight_paths.load(FLIGHT_PATHS, -PATH_MARGIN, SCREEN_WIDTH + PATH_MARGIN)
+   mismatches = check_paths(flight_paths)
+
+   trig_ms = time_moves(flight_paths, args.enemies, args.ticks, args.repeat, "update_trig")
+   table_ms = time_moves(flight_paths, args.enemies, args.ticks, args.repeat, "update_table")
+   batched_trig_ms = time_batched(flight_paths, args.enemies, args.ticks, args.repeat, False)
+   batched_table_ms = time_batched(flight_paths, args.enemies, args.ticks, args.repeat, True)
+   moves = args.enemies * args.ticks
+
+   report = {
+      "enemies": args.enemies,
+      "ticks": args.ticks,
+      "exact": len(mismatches) == 0,
+      "mismatches": mismatches[:10],
+      "trig_ms": trig_ms,
+      "table_ms": table_ms,
+      "trig_ns_per_move": trig_ms * 1e6 / moves,
+      "table_ns_per_move": table_ms * 1e6 / moves,
+      "speedup": trig_ms / max(table_ms, 1e-9),
+      "store_trig_ms": batched_trig_ms,
+      "store_table_ms": batched_table_ms,
+      "store_speedup": batched_trig_ms / max(batched_table_ms, 1e-9)
+   }
+   print(json.dumps(report, indent=3))
+   if len(mismatches) > 0:
+      sys.exit(1)
+
+if __name__ == "__main__":
+   main()
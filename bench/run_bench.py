@@ -0,0 +1,318 @@
+# Scenario benchmarks for the main game loop.
+#
+# Each scenario runs game() headless with a fixed seed, scripted input and
+# a scripted game state, then reports frame time percentiles, allocations
+# per frame and entity counts as JSON so runs can be compared over time.
+#
+# Usage (from the project top level directory):
+#
+#   python bench/run_bench.py [--frames N] [--warmup N] [--scenario NAME] [--enemy-store] [--output FILE]
+#
+# Every scenario is run twice: once for timing and once under tracemalloc
+# for the allocation figures, so tracing doesn't skew the frame times. The
+# allocation figures of a frame are:
+# - peak_bytes: the traced memory high-water mark above the start of the
+#   frame, which includes temporaries freed before the frame ended
+# - new_bytes / new_blocks: memory allocated during the frame and still held
+#   at its end, from a tracemalloc snapshot diff (the growth of every
+#   allocation site, so frees elsewhere don't cancel it out)
+
+#------------------------------
+# Imports
+#------------------------------
+import os          # Paths
+import sys         # Module search path
+import json        # Report output
+import time        # Frame timing
+import gc          # Garbage collector statistics
+import argparse    # Command line options
+import platform    # Report metadata
+import tracemalloc # Allocation tracking
+
+# Run from the project top level directory, where the asset paths are relative to
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+os.chdir(ROOT_DIR)
+
+import pygame  # Import the pygame library
+import game    # The game under test
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Default number of measured and warm-up frames per scenario
+BENCH_FRAMES = 600
+BENCH_WARMUP = 60
+
+# Seed used for every scenario
+BENCH_SEED = 1234
+
+# Sprite groups reported in the entity counts
+ENTITY_GROUPS = ["enemies", "bullets", "explosions", "clouds", "orbs"]
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Pressed key state holding down a fixed set of keys
+class HeldKeys(object):
+   def __init__(self, keys):
+      self.keys = set(keys)
+
+   def __getitem__(self, key):
+      return key in self.keys
+
+# Frame Recorder Class
+# Collects per-frame timings, allocations and entity counts from the on_frame hook
+class FrameRecorder(object):
+   def __init__(self, warmup, trace):
+      self.warmup = warmup
+      self.trace = trace
+      self.frame_ms = []
+      self.peak_bytes = []
+      self.new_bytes = []
+      self.new_blocks = []
+      self.entities = {name: [] for name in ENTITY_GROUPS + ["waves", "shields"]}
+      self.last = None
+      self.trace_start = 0
+      self.snapshot = None
+      self.gc_start = sum(stat["collections"] for stat in gc.get_stats())
+      self.gc_collections = 0
+      # Frame cache counters at the end of the warm-up
+      self.cache_start = game.frame_cache.get_stats()
+
+   # Start timing the next frame, outside of the scenario's own work
+   def start(self):
+      if self.trace == True:
+         self.snapshot = take_snapshot()
+         tracemalloc.reset_peak()
+         self.trace_start = tracemalloc.get_traced_memory()[0]
+      self.last = time.perf_counter()
+
+   # Record the frame that just finished
+   def record(self, frame):
+      now = time.perf_counter()
+      if frame <= self.warmup:
+         if frame == self.warmup:
+            self.gc_start = sum(stat["collections"] for stat in gc.get_stats())
+            self.cache_start = game.frame_cache.get_stats()
+         return
+      if self.trace == True:
+         self.peak_bytes.append(tracemalloc.get_traced_memory()[1] - self.trace_start)
+         stats = take_snapshot().compare_to(self.snapshot, "lineno")
+         self.new_bytes.append(sum(stat.size_diff for stat in stats if stat.size_diff > 0))
+         self.new_blocks.append(sum(stat.count_diff for stat in stats if stat.count_diff > 0))
+      else:
+         self.frame_ms.append((now - self.last) * 1000)
+      for name in ENTITY_GROUPS:
+         self.entities[name].append(len(getattr(game, name)))
+      self.entities["waves"].append(len(game.waves))
+      self.entities["shields"].append(len(game.shields))
+
+#------------------------------
+# Scenarios
+#------------------------------
+
+# Each scenario has:
+# - keys:   keys held down for the whole run
+# - spawn:  spawn intervals (ms) used instead of the game's defaults
+# - setup(player, score):        called once before the first measured frame
+# - step(frame, player, score):  called at the end of every frame
+
+# Keep the player alive so every scenario runs to the end
+def keep_alive(player):
+   player.inc_health(game.PLAYER_HEALTH_MAX)
+
+# Idle sky: no enemies, a screen full of clouds
+def idle_setup(player, score):
+   for i in range(12):
+      game.spawn_cloud(game.rng.randint(0, game.SCREEN_WIDTH))
+
+def idle_step(frame, player, score):
+   keep_alive(player)
+
+# 500 enemies spread across the screen on every movement pattern
+def swarm_setup(player, score):
+   swarm_step(0, player, score)
+
+def swarm_step(frame, player, score):
+   keep_alive(player)
+   while len(game.enemies) < 500:
+      game.spawn_enemy(game.rng.randint(0, game.SCREEN_WIDTH + 100))
+
+# Sustained spread-shot fire with power=1
+def spread_setup(player, score):
+   player.inc_power(game.MAX_POWER)
+
+def spread_step(frame, player, score):
+   keep_alive(player)
+   player.inc_power(game.MAX_POWER)
+
+# A red Wave and a blue Shield active together, re-triggered when they end
+def wave_shield_setup(player, score):
+   wave_shield_step(0, player, score)
+
+def wave_shield_step(frame, player, score):
+   keep_alive(player)
+   if len(game.waves) == 0:
+      player.collect_orb(0)
+      player.use_power(0)
+   if len(game.shields) == 0:
+      player.collect_orb(2)
+      player.use_power(2)
+
+SCENARIOS = {
+   "idle_clouds": {
+      "keys": [],
+      "spawn": [(game.SPAWN_CLOUD, 2000)],
+      "setup": idle_setup,
+      "step": idle_step
+   },
+   "enemy_swarm_500": {
+      "keys": [],
+      "spawn": [(game.SPAWN_CLOUD, 2000)],
+      "setup": swarm_setup,
+      "step": swarm_step
+   },
+   "spread_shot": {
+      "keys": [pygame.K_SPACE],
+      "spawn": list(game.spawn_intervals),
+      "setup": spread_setup,
+      "step": spread_step
+   },
+   "wave_and_shield": {
+      "keys": [],
+      "spawn": [(game.SPAWN_ENEMY, 50), (game.SPAWN_CLOUD, 2000)],
+      "setup": wave_shield_setup,
+      "step": wave_shield_step
+   }
+}
+
+#------------------------------
+# Functions
+#------------------------------
+
+# Take a snapshot of the traced allocations, leaving out tracemalloc's own
+def take_snapshot():
+   return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+# Get a percentile (nearest rank) of a list of values
+def percentile(values, pct):
+   if len(values) == 0:
+      return 0
+   ordered = sorted(values)
+   index = int(round((pct / 100) * (len(ordered) - 1)))
+   return ordered[index]
+
+# Summarize a list of per-frame values
+def summarize(values):
+   if len(values) == 0:
+      return {"mean": 0, "p50": 0, "p95": 0, "p99": 0, "max": 0}
+   return {
+      "mean": sum(values) / len(values),
+      "p50": percentile(values, 50),
+      "p95": percentile(values, 95),
+      "p99": percentile(values, 99),
+      "max": max(values)
+   }
+
+# Run one pass of a scenario and return its recorder
+def run_pass(scenario, frames, warmup, trace):
+   default_spawn = game.spawn_intervals
+   game.spawn_intervals = scenario["spawn"]
+   game.init(headless=True, seed=BENCH_SEED)
+
+   recorder = FrameRecorder(warmup, trace)
+   keys = HeldKeys(scenario["keys"])
+
+   def on_frame(frame, player, score):
+      recorder.record(frame)
+      if frame == 1:
+         scenario["setup"](player, score)
+      scenario["step"](frame, player, score)
+      recorder.start()
+
+   if trace == True:
+      tracemalloc.start()
+   recorder.start()
+   try:
+      game.game(max_frames=warmup + frames, input_fn=lambda frame: keys, on_frame=on_frame)
+   finally:
+      if trace == True:
+         tracemalloc.stop()
+      game.spawn_intervals = default_spawn
+   recorder.gc_collections = sum(stat["collections"] for stat in gc.get_stats()) - recorder.gc_start
+   recorder.audio = game.audio.get_stats()
+   # Frame cache lookups during the measured frames (misses and disk loads should be 0)
+   cache_end = game.frame_cache.get_stats()
+   recorder.frame_cache = {name: cache_end[name] - recorder.cache_start[name] for name in ["hits", "misses", "disk_loads"]}
+   recorder.pools = {"bullet_pool": game.bullet_pool.get_stats(), "enemy_pool": game.enemy_pool.get_stats()}
+   recorder.render_layers = game.render_queue.get_stats()
+   # Headless runs one tick per frame, so the HUD rate is per simulated second
+   hud_renders = game.hud.get_stats()["renders"]
+   recorder.hud = {"renders": hud_renders, "renders_per_second": sum(hud_renders.values()) * game.SIM_TICK_RATE / (warmup + frames)}
+   return recorder
+
+# Run a scenario and build its report
+def run_scenario(scenario, frames, warmup):
+   timing = run_pass(scenario, frames, warmup, False)
+   allocs = run_pass(scenario, frames, warmup, True)
+   return {
+      "frames": len(timing.frame_ms),
+      "frame_ms": summarize(timing.frame_ms),
+      "fps_mean": 1000 / max(summarize(timing.frame_ms)["mean"], 1e-9),
+      "peak_bytes_per_frame": summarize(allocs.peak_bytes),
+      "new_bytes_per_frame": summarize(allocs.new_bytes),
+      "new_blocks_per_frame": summarize(allocs.new_blocks),
+      "gc_collections": timing.gc_collections,
+      "audio": timing.audio,
+      "frame_cache": timing.frame_cache,
+      "pools": timing.pools,
+      "render_layers": timing.render_layers,
+      "hud": timing.hud,
+      "entities": {name: {"mean": summarize(counts)["mean"], "max": summarize(counts)["max"]} for name, counts in timing.entities.items()}
+   }
+
+#------------------------------
+# Core Logic
+#------------------------------
+
+def main():
+   parser = argparse.ArgumentParser(description="Run the game loop benchmark scenarios.")
+   parser.add_argument("--frames", type=int, default=BENCH_FRAMES, help="measured frames per scenario")
+   parser.add_argument("--warmup", type=int, default=BENCH_WARMUP, help="frames to run before measuring")
+   parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="scenario to run (default: all)")
+   parser.add_argument("--enemy-store", action="store_true", help="use the NumPy enemy backend")
+   parser.add_argument("--output", default=None, help="write the JSON report to this file")
+   args = parser.parse_args()
+
+   game.USE_ENEMY_STORE = args.enemy_store
+
+   report = {
+      "meta": {
+         "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+         "python": platform.python_version(),
+         "pygame": pygame.version.ver,
+         "platform": platform.platform(),
+         "frames": args.frames,
+         "warmup": args.warmup,
+         "seed": BENCH_SEED,
+         "enemy_store": args.enemy_store
+      },
+      "scenarios": {}
+   }
+   for name in args.scenario or list(SCENARIOS):
+      report["scenarios"][name] = run_scenario(SCENARIOS[name], args.frames, args.warmup)
+
+   game.cleanup()
+
+   text = json.dumps(report, indent=3)
+   if args.output != None:
+      with open(args.output, "w") as output_file:
+         output_file.write(text + "\n")
+   else:
+      print(text)
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,113 @@
+# Parallel asset loading.
+#
+# Every image and sound listed in a manifest is decoded once at startup on
+# a thread pool. pygame releases the GIL while SDL_image and SDL_mixer
+# decode, so PNG, OGG and MP3 files decode side by side. Only the decode
+# runs on the workers: converting images to the display format happens
+# afterwards on the main thread, in the frame cache.
+#
+# Manifest entries are (kind, path, option) tuples, where option is
+# whatever the game needs to finish setting the asset up (e.g. the
+# colorkey of an image); the loader itself only looks at kind and path.
+#
+# Assets found in a baked asset pack are taken from it instead, and only
+# the rest is decoded.
+
+#------------------------------
+# Imports
+#------------------------------
+import os                  # CPU count
+import time                # Load timing
+import concurrent.futures  # Thread pool
+import pygame              # Import the pygame library
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Asset kinds
+ASSET_IMAGE = "image"
+ASSET_SOUND = "sound"
+
+# Number of decode threads
+ASSET_LOAD_WORKERS = min(8, os.cpu_count() or 1)
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Asset Loader Class
+class AssetLoader(object):
+   def __init__(self, workers=ASSET_LOAD_WORKERS):
+      self.workers = workers
+      # Decoded assets keyed by path
+      self.images = {}
+      self.sounds = {}
+      self.decode_ms = 0.0
+      # Number of assets taken from the asset pack and decoded
+      self.from_pack = 0
+      self.decoded = 0
+
+   # Decode every asset in a manifest, each path once
+   # - progress(done, total, path) is called on this thread as each asset finishes
+   # - pack is an open AssetPack to take assets from before decoding anything
+   def load(self, manifest, progress=None, pack=None):
+      jobs = []
+      for kind, path, option in manifest:
+         if (kind, path) not in jobs:
+            jobs.append((kind, path))
+
+      start_time = time.perf_counter()
+      done = 0
+      if pack != None:
+         remaining = []
+         for kind, path in jobs:
+            if kind == ASSET_IMAGE:
+               asset = pack.get_image(path)
+               if asset != None:
+                  self.images[path] = asset
+            else:
+               asset = pack.get_sound(path)
+               if asset != None:
+                  self.sounds[path] = asset
+            if asset == None:
+               remaining.append((kind, path))
+            else:
+               self.from_pack += 1
+               done += 1
+               if progress != None:
+                  progress(done, len(jobs), path)
+         total = len(jobs)
+         jobs = remaining
+      else:
+         total = len(jobs)
+
+      with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+         futures = {pool.submit(decode_asset, kind, path): (kind, path) for kind, path in jobs}
+         for future in concurrent.futures.as_completed(futures):
+            kind, path = futures[future]
+            if kind == ASSET_IMAGE:
+               self.images[path] = future.result()
+            else:
+               self.sounds[path] = future.result()
+            self.decoded += 1
+            done += 1
+            if progress != None:
+               progress(done, total, path)
+      self.decode_ms = (time.perf_counter() - start_time) * 1000
+
+   # Get the loader counters
+   def get_stats(self):
+      return {"images": len(self.images), "sounds": len(self.sounds), "from_pack": self.from_pack, "decoded": self.decoded, "workers": self.workers, "decode_ms": self.decode_ms}
+
+#------------------------------
+# Functions
+#------------------------------
+
+# Decode one asset (runs on a worker thread)
+def decode_asset(kind, path):
+   if kind == ASSET_IMAGE:
+      return pygame.image.load(path)
+   elif kind == ASSET_SOUND:
+      return pygame.mixer.Sound(path)
+   raise ValueError("Unknown asset kind: {}".format(kind))
@@ -0,0 +1,217 @@
+# Baked asset pack.
+#
+# An offline bake step decodes every image under assets/sprites and every
+# sound under assets/audio once, and writes the raw results into a single
+# pack file: pixel buffers (RGB, or RGBA for images with per-pixel alpha),
+# collision masks for colorkeyed images, and PCM samples in the mixer's
+# format. At startup the pack is memory-mapped and surfaces and sounds are
+# built straight from its buffers, with no PNG/OGG/MP3 decoding at all.
+#
+# Each entry remembers the size and modification time of its source file.
+# Entries whose source has changed since the bake (and sounds, when the
+# mixer runs in a different format) are reported as missing, so the caller
+# falls back to decoding the source file as usual.
+#
+# Pack format:
+#
+#   magic "APAK", version (u16), index offset (u64), index length (u64)
+#   data blobs
+#   index (JSON): mixer format and one entry per source path
+#
+# Usage (from the project top level directory):
+#
+#   python src/asset_pack.py [pack]
+
+#------------------------------
+# Imports
+#------------------------------
+import os      # Paths and file stats
+import sys     # Command line arguments
+import json    # Pack index
+import mmap    # Memory-mapped pack
+import struct  # Pack header
+import pygame  # Import the pygame library
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Default pack location, relative to project top level directory
+ASSET_PACK = "assets/assets.pak"
+
+# Directories baked into the pack
+ASSET_PACK_ROOTS = ["assets/sprites", "assets/audio"]
+IMAGE_EXTENSIONS = [".png"]
+SOUND_EXTENSIONS = [".wav", ".ogg", ".mp3"]
+
+PACK_MAGIC = b"APAK"
+PACK_VERSION = 1
+PACK_HEADER = "<4sHQQ"
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Asset Pack Class
+class AssetPack(object):
+   def __init__(self):
+      self.index = {}
+      self.mixer_format = None
+      self.pack_file = None
+      self.data = None
+      # Counters
+      self.images = 0
+      self.masks = 0
+      self.sounds = 0
+      self.stale = 0
+
+   # Map a pack file, returns False if it's missing or not a pack of this version
+   def open(self, path=ASSET_PACK):
+      if os.path.exists(path) == False:
+         return False
+      self.pack_file = open(path, "rb")
+      # Copy-on-write mapping: pygame wants writable buffers, the file is never changed
+      self.data = mmap.mmap(self.pack_file.fileno(), 0, access=mmap.ACCESS_COPY)
+      magic, version, index_offset, index_length = struct.unpack_from(PACK_HEADER, self.data, 0)
+      if magic != PACK_MAGIC or version != PACK_VERSION:
+         self.close()
+         return False
+      index = json.loads(self.data[index_offset:index_offset + index_length].decode("utf-8"))
+      self.mixer_format = tuple(index["mixer"])
+      self.index = index["entries"]
+      return True
+
+   def close(self):
+      if self.data != None:
+         self.data.close()
+         self.pack_file.close()
+      self.data = None
+      self.pack_file = None
+      self.index = {}
+
+   # Get a fresh entry for a source path, None if it isn't baked or its source changed
+   def get_entry(self, path, kind):
+      entry = self.index.get(path)
+      if entry == None or entry["kind"] != kind:
+         return None
+      if os.path.exists(path) == True:
+         stat = os.stat(path)
+         if stat.st_size != entry["source_size"] or stat.st_mtime_ns != entry["source_mtime_ns"]:
+            self.stale += 1
+            return None
+      return entry
+
+   def get_buffer(self, blob):
+      offset, length = blob
+      return memoryview(self.data)[offset:offset + length]
+
+   # Get an image as an unconverted surface over the pack's buffer, or None
+   def get_image(self, path):
+      entry = self.get_entry(path, "image")
+      if entry == None:
+         return None
+      self.images += 1
+      return pygame.image.frombuffer(self.get_buffer(entry["pixels"]), tuple(entry["size"]), entry["format"])
+
+   # Get the collision mask baked for an image with a colorkey, or None
+   def get_mask(self, path, colorkey):
+      entry = self.get_entry(path, "image")
+      if entry == None or entry["mask"] == None or entry["colorkey"] == None or tuple(entry["colorkey"]) != colorkey:
+         return None
+      # One byte per pixel, non-zero where the mask is set
+      mask_surf = pygame.image.frombuffer(self.get_buffer(entry["mask"]), tuple(entry["size"]), "P")
+      mask_surf.set_colorkey(0)
+      self.masks += 1
+      return pygame.mask.from_surface(mask_surf)
+
+   # Get a sound from its baked PCM samples, or None (also when the mixer format differs)
+   def get_sound(self, path):
+      entry = self.get_entry(path, "sound")
+      if entry == None or self.mixer_format != pygame.mixer.get_init():
+         return None
+      self.sounds += 1
+      return pygame.mixer.Sound(buffer=self.get_buffer(entry["pcm"]))
+
+   # Get the pack counters
+   def get_stats(self):
+      return {"entries": len(self.index), "images": self.images, "masks": self.masks, "sounds": self.sounds, "stale": self.stale}
+
+#------------------------------
+# Functions
+#------------------------------
+
+# List the files to bake under the pack roots
+def find_assets(roots=ASSET_PACK_ROOTS):
+   paths = []
+   for root in roots:
+      for dir_path, dir_names, file_names in os.walk(root):
+         dir_names.sort()
+         for file_name in sorted(file_names):
+            extension = os.path.splitext(file_name)[1].lower()
+            if extension in IMAGE_EXTENSIONS or extension in SOUND_EXTENSIONS:
+               paths.append(os.path.join(dir_path, file_name).replace(os.sep, "/"))
+   return paths
+
+# Decode every asset under the roots and write the pack
+# - colorkeys maps image paths to the colorkey the game uses them with;
+#   those images also get a baked collision mask
+# (needs pygame.mixer initialized in the format the game will use)
+def bake(pack_path=ASSET_PACK, colorkeys={}, roots=ASSET_PACK_ROOTS):
+   blobs = bytearray()
+   entries = {}
+   data_offset = struct.calcsize(PACK_HEADER)
+
+   def add_blob(data):
+      offset = data_offset + len(blobs)
+      blobs.extend(data)
+      return [offset, len(data)]
+
+   for path in find_assets(roots):
+      stat = os.stat(path)
+      entry = {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+      if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS:
+         image = pygame.image.load(path)
+         pixel_format = "RGB"
+         if image.get_flags() & pygame.SRCALPHA:
+            pixel_format = "RGBA"
+         entry.update({"kind": "image", "size": list(image.get_size()), "format": pixel_format, "colorkey": None, "mask": None})
+         entry["pixels"] = add_blob(pygame.image.tobytes(image, pixel_format))
+         colorkey = colorkeys.get(path)
+         if colorkey != None:
+            # Mask as one byte per pixel, from the colorkeyed image
+            image.set_colorkey(colorkey)
+            mask_surf = pygame.mask.from_surface(image).to_surface(setcolor=(1, 1, 1, 255), unsetcolor=(0, 0, 0, 255))
+            entry["colorkey"] = list(colorkey)
+            entry["mask"] = add_blob(pygame.image.tobytes(mask_surf, "RGB")[0::3])
+      else:
+         sound = pygame.mixer.Sound(path)
+         entry.update({"kind": "sound", "pcm": add_blob(sound.get_raw())})
+      entries[path] = entry
+
+   index = json.dumps({"mixer": list(pygame.mixer.get_init()), "entries": entries}).encode("utf-8")
+   with open(pack_path, "wb") as pack_file:
+      pack_file.write(struct.pack(PACK_HEADER, PACK_MAGIC, PACK_VERSION, data_offset + len(blobs), len(index)))
+      pack_file.write(blobs)
+      pack_file.write(index)
+   print("Baked {} assets into {} ({} bytes)".format(len(entries), pack_path, data_offset + len(blobs) + len(index)))
+
+#------------------------------
+# Core Logic
+#------------------------------
+
+if __name__ == "__main__":
+   # No window or sound output needed to bake
+   os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+   os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+   pygame.mixer.init()
+   pygame.init()
+
+   # The game's manifest says which colorkey each sprite image is used with
+   import game
+   colorkeys = {path: option for kind, path, option in game.ASSET_MANIFEST if kind == game.ASSET_IMAGE}
+
+   if len(sys.argv) > 1:
+      bake(sys.argv[1], colorkeys)
+   else:
+      bake(ASSET_PACK, colorkeys)
+   pygame.quit()
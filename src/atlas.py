@@ -0,0 +1,193 @@
+# Sprite-sheet atlas.
+#
+# Sheets listed in a JSON manifest are loaded once and every frame is cut
+# out as a subsurface, so all frames of a sheet share the sheet's pixel
+# buffer (no pixel copies). Frames are looked up by name and grouped into
+# named sequences for animations.
+#
+# Manifest format (paths are relative to the project top level directory):
+#
+#   {
+#      "sheets": [
+#         {
+#            "name": "game_white",
+#            "image": "assets/sprites/sheets/game_white.png",
+#            "colorkey": [255, 255, 255],   (optional, otherwise "alpha": true)
+#            "packed": true,                (optional, see pack() below)
+#            "frames": { "<frame name>": [x, y, width, height], ... }
+#         }
+#      ],
+#      "sequences": { "<sequence name>": ["<frame name>", ...] }
+#   }
+#
+# Packed sheets are generated from individual images: the frame names are
+# the source image paths. Running this module repacks them:
+#
+#   python src/atlas.py [manifest]
+
+#------------------------------
+# Imports
+#------------------------------
+import json    # Manifest parsing
+import re      # Manifest formatting
+import sys     # Command line arguments
+import pygame  # Import the pygame library
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Default manifest location, relative to project top level directory
+ATLAS_MANIFEST = "assets/sprites/sheets/atlas.json"
+
+# Packed sheet layout (pixels)
+PACK_MAX_WIDTH = 512
+PACK_PADDING = 1
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Atlas Class
+class Atlas(object):
+   def __init__(self):
+      # Full sheet surfaces keyed by sheet name
+      self.sheets = {}
+      # Frame subsurfaces and their colorkeys keyed by frame name
+      self.frames = {}
+      self.colorkeys = {}
+      # Lists of frame names keyed by sequence name
+      self.sequences = {}
+      # Number of image files opened
+      self.file_loads = 0
+
+   # Load every sheet in a manifest (call after the display is created)
+   # - images holds sheet images already decoded, keyed by path
+   def load(self, manifest_path, images=None):
+      manifest = read_manifest(manifest_path)
+
+      for sheet_info in manifest["sheets"]:
+         sheet = None
+         if images != None:
+            sheet = images.get(sheet_info["image"])
+         if sheet == None:
+            sheet = pygame.image.load(sheet_info["image"])
+            self.file_loads += 1
+         colorkey = None
+         if sheet_info.get("alpha", False) == True:
+            sheet = sheet.convert_alpha()
+         else:
+            sheet = sheet.convert()
+            colorkey = tuple(sheet_info["colorkey"])
+            # No RLEACCEL: RLE encoding would copy the frames out of the sheet
+            sheet.set_colorkey(colorkey)
+         self.sheets[sheet_info["name"]] = sheet
+
+         # Subsurfaces inherit the sheet's colorkey
+         for name, rect in sheet_info["frames"].items():
+            self.frames[name] = sheet.subsurface(pygame.Rect(rect))
+            self.colorkeys[name] = colorkey
+
+      self.sequences.update(manifest.get("sequences", {}))
+
+   def has_frame(self, name):
+      return name in self.frames
+
+   def get_frame(self, name):
+      return self.frames[name]
+
+   # Get the colorkey of a frame, or None for per-pixel alpha sheets
+   def get_colorkey(self, name):
+      return self.colorkeys[name]
+
+   # Get the frames of a named animation sequence
+   def get_sequence(self, name):
+      return [self.frames[frame] for frame in self.sequences[name]]
+
+   # Get the atlas counters
+   def get_stats(self):
+      return {"sheets": len(self.sheets), "frames": len(self.frames), "file_loads": self.file_loads}
+
+#------------------------------
+# Functions
+#------------------------------
+
+# Read a manifest without loading any of its sheets
+def read_manifest(manifest_path):
+   with open(manifest_path) as manifest_file:
+      return json.load(manifest_file)
+
+# Get the colorkey of every frame in a manifest (None for alpha sheets)
+def get_frame_colorkeys(manifest):
+   colorkeys = {}
+   for sheet_info in manifest["sheets"]:
+      colorkey = None
+      if sheet_info.get("alpha", False) == False:
+         colorkey = tuple(sheet_info["colorkey"])
+      for name in sheet_info["frames"]:
+         colorkeys[name] = colorkey
+   return colorkeys
+
+# Lay out images on shelves, tallest first; returns rects and sheet size
+def shelf_pack(sizes, max_width=PACK_MAX_WIDTH, padding=PACK_PADDING):
+   rects = {}
+   x = padding
+   y = padding
+   shelf_height = 0
+   width = 0
+   for name in sorted(sizes, key=lambda n: (-sizes[n][1], n)):
+      w, h = sizes[name]
+      # Start a new shelf when this image does not fit
+      if x + w + padding > max_width and x > padding:
+         x = padding
+         y += shelf_height + padding
+         shelf_height = 0
+      rects[name] = [x, y, w, h]
+      x += w + padding
+      width = max(width, x)
+      shelf_height = max(shelf_height, h)
+   return rects, (width, y + shelf_height + padding)
+
+# Rebuild every packed sheet in a manifest from its source images
+def pack(manifest_path=ATLAS_MANIFEST):
+   with open(manifest_path) as manifest_file:
+      manifest = json.load(manifest_file)
+
+   for sheet_info in manifest["sheets"]:
+      if sheet_info.get("packed", False) == False:
+         continue
+
+      # Frame names are the source image paths
+      images = {}
+      for name in sheet_info["frames"]:
+         images[name] = pygame.image.load(name)
+      rects, size = shelf_pack({name: img.get_size() for name, img in images.items()})
+
+      # Colorkeyed sheets are opaque, padding is filled with the colorkey
+      sheet = pygame.Surface(size, 0, 24)
+      sheet.fill(tuple(sheet_info["colorkey"]))
+      for name, img in images.items():
+         # Drop any alpha channel the same way convert() does at load time
+         sheet.blit(img.convert(sheet), rects[name][:2])
+      pygame.image.save(sheet, sheet_info["image"])
+
+      sheet_info["frames"] = {name: rects[name] for name in sheet_info["frames"]}
+      print("Packed {} images into {} ({}x{})".format(len(images), sheet_info["image"], size[0], size[1]))
+
+   # Keep each rect (and colorkey) on a single line
+   text = json.dumps(manifest, indent=3)
+   text = re.sub(r"\[\s+([\d,\s]+?)\s+\]", lambda m: "[" + ", ".join(v.strip() for v in m.group(1).split(",")) + "]", text)
+   with open(manifest_path, "w") as manifest_file:
+      manifest_file.write(text + "\n")
+
+#------------------------------
+# Core Logic
+#------------------------------
+
+if __name__ == "__main__":
+   pygame.init()
+   if len(sys.argv) > 1:
+      pack(sys.argv[1])
+   else:
+      pack()
+   pygame.quit()
@@ -0,0 +1,174 @@
+# Audio manager.
+#
+# Every sound is decoded to PCM once when it's loaded (pygame.mixer.Sound
+# keeps the decoded samples in memory), and plays on a fixed set of mixer
+# channels reserved for its category (music, weapons, explosions, UI).
+# Each category has a voice limit: when all of its channels are busy a new
+# sound steals the channel playing the lowest priority, oldest sound, or is
+# dropped if everything playing matters more.
+#
+# Between begin_frame() and end_frame(), triggering the same sound more
+# than once only plays it once, so a Wave killing dozens of enemies on one
+# frame costs one explosion voice instead of dozens. Sounds can also have a
+# minimum retrigger interval (e.g. the gun's pew).
+
+#------------------------------
+# Imports
+#------------------------------
+import collections  # Ordered categories
+import pygame       # Import the pygame library
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Sound categories
+AUDIO_MUSIC = "music"
+AUDIO_WEAPONS = "weapons"
+AUDIO_EXPLOSIONS = "explosions"
+AUDIO_UI = "ui"
+
+# Mixer channels reserved for each category (its voice limit)
+AUDIO_CHANNELS = collections.OrderedDict([
+   (AUDIO_MUSIC, 2),
+   (AUDIO_WEAPONS, 2),
+   (AUDIO_EXPLOSIONS, 4),
+   (AUDIO_UI, 2)
+])
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Sound Handle Class
+# Stands in for a pygame.mixer.Sound, routing play() through the manager
+class SoundHandle(object):
+   def __init__(self, manager, name):
+      self.manager = manager
+      self.name = name
+
+   def play(self, loops=0):
+      return self.manager.play(self.name, loops)
+
+   def stop(self):
+      self.manager.stop(self.name)
+
+   def fadeout(self, ms):
+      self.manager.fadeout(self.name, ms)
+
+# Audio Manager Class
+class AudioManager(object):
+   def __init__(self, channels=AUDIO_CHANNELS):
+      # Loaded sounds: name -> (Sound, category, priority, min interval ms)
+      self.sounds = {}
+      # Channels of each category, and what each channel is playing as
+      # (name, priority, start order)
+      self.channels = collections.OrderedDict()
+      self.playing = {}
+
+      # Reserve the category channels so pygame never hands them out itself
+      self.total_channels = sum(channels.values())
+      if pygame.mixer.get_num_channels() < self.total_channels:
+         pygame.mixer.set_num_channels(self.total_channels)
+      pygame.mixer.set_reserved(self.total_channels)
+      first = 0
+      for category, count in channels.items():
+         self.channels[category] = [pygame.mixer.Channel(first + i) for i in range(count)]
+         first += count
+      self.order = 0
+      # Sounds already played this frame, None outside a frame
+      self.frame_played = None
+      # Last start time (ms) of each sound, for the retrigger interval
+      self.last_start = {}
+      # Counters
+      self.played = 0
+      self.coalesced = 0
+      self.throttled = 0
+      self.stolen = 0
+      self.dropped = 0
+
+   # Decode a sound file once and register it under a name
+   # - priority decides which sounds can steal a voice from which (higher wins)
+   # - min_interval (ms) drops retriggers that come sooner than that
+   # - sound is the already decoded Sound, if it was loaded ahead of time
+   def load(self, name, path, category, priority=0, min_interval=0, sound=None):
+      if sound == None:
+         sound = pygame.mixer.Sound(path)
+      self.sounds[name] = (sound, category, priority, min_interval)
+      return SoundHandle(self, name)
+
+   # Start coalescing identical triggers
+   def begin_frame(self):
+      self.frame_played = set()
+
+   # Stop coalescing, sounds play straight away again (e.g. in menus)
+   def end_frame(self):
+      self.frame_played = None
+
+   # Play a sound on one of its category's channels
+   # Returns the channel, or None if the sound was coalesced, throttled or dropped
+   def play(self, name, loops=0):
+      sound, category, priority, min_interval = self.sounds[name]
+
+      # Only once per frame
+      if self.frame_played != None:
+         if name in self.frame_played:
+            self.coalesced += 1
+            return None
+         self.frame_played.add(name)
+
+      # Not again too soon
+      now = pygame.time.get_ticks()
+      if min_interval > 0 and name in self.last_start and (now - self.last_start[name]) < min_interval:
+         self.throttled += 1
+         return None
+
+      channel = self.get_channel(category, priority)
+      if channel == None:
+         self.dropped += 1
+         return None
+      channel.play(sound, loops)
+      self.playing[channel] = (name, priority, self.order)
+      self.order += 1
+      self.last_start[name] = now
+      self.played += 1
+      return channel
+
+   # Find a free channel in a category, or steal the lowest priority, oldest one
+   def get_channel(self, category, priority):
+      victim = None
+      for channel in self.channels[category]:
+         if channel.get_busy() == False:
+            return channel
+         name, playing_priority, order = self.playing.get(channel, (None, -1, -1))
+         if victim == None or (playing_priority, order) < victim[0]:
+            victim = ((playing_priority, order), channel)
+      if victim == None or victim[0][0] > priority:
+         return None
+      self.stolen += 1
+      victim[1].stop()
+      return victim[1]
+
+   # Stop every channel playing a sound
+   def stop(self, name):
+      for channel in self.find_channels(name):
+         channel.stop()
+
+   def fadeout(self, name, ms):
+      for channel in self.find_channels(name):
+         channel.fadeout(ms)
+
+   def find_channels(self, name):
+      category = self.sounds[name][1]
+      return [channel for channel in self.channels[category] if channel.get_busy() == True and self.playing.get(channel, (None,))[0] == name]
+
+   # Get the counters and the voices busy in each category
+   def get_stats(self):
+      return {
+         "played": self.played,
+         "coalesced": self.coalesced,
+         "throttled": self.throttled,
+         "stolen": self.stolen,
+         "dropped": self.dropped,
+         "busy": {category: sum(1 for channel in channels if channel.get_busy() == True) for category, channels in self.channels.items()}
+      }
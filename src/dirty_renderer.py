@@ -0,0 +1,92 @@
+# Dirty-rectangle renderer.
+#
+# Instead of filling the whole screen and flipping all of it every frame,
+# only the rects drawn on the previous frame are erased back to the
+# background, and only those plus the rects drawn this frame are pushed to
+# the display with pygame.display.update(rects).
+#
+# Anything drawn outside the tracked rects (e.g. full-screen Wave rings)
+# needs a full redraw: asking for one also forces the next frame to be a
+# full redraw, so the untracked drawing gets cleaned up.
+
+#------------------------------
+# Imports
+#------------------------------
+import pygame  # Import the pygame library
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Dirty Renderer Class
+class DirtyRenderer(object):
+   def __init__(self, background, enabled=False):
+      self.background = background
+      self.enabled = enabled
+      # Rects drawn on the previous frame and on this frame
+      self.last_rects = []
+      self.rects = []
+      # Full redraw pending for the next frame
+      self.full = True
+      self.full_frame = True
+      # Counters
+      self.full_frames = 0
+      self.dirty_frames = 0
+      self.pixels_updated = 0
+
+   # Turn dirty-rect mode on or off
+   def enable(self, enabled=True):
+      self.enabled = enabled
+      self.full = True
+
+   # Force a full redraw on the next frame (e.g. after a menu drew over the screen)
+   def invalidate(self):
+      self.full = True
+
+   # Clear the screen for a new frame
+   # - full asks for a full redraw this frame (and the next one)
+   def begin_frame(self, surf, full=False):
+      self.rects = []
+      self.full_frame = full or self.full or self.enabled == False
+      self.full = full
+      if self.full_frame == True:
+         surf.fill(self.background)
+      else:
+         # Erase what was drawn last frame
+         for rect in self.last_rects:
+            surf.fill(self.background, rect)
+
+   # Blit and track the rect that was drawn
+   def blit(self, surf, image, rect):
+      self.rects.append(surf.blit(image, rect))
+
+   # Blit a sequence of (image, position) in one call, tracking the rects
+   # drawn only when they're needed to erase them next frame
+   def blits(self, surf, blit_sequence):
+      if self.enabled == True:
+         self.rects.extend(surf.blits(blit_sequence))
+      else:
+         surf.blits(blit_sequence, doreturn=False)
+
+   # Track a rect drawn some other way
+   def add(self, rect):
+      if rect != None:
+         self.rects.append(rect)
+
+   # Push the frame to the display
+   def present(self):
+      if self.full_frame == True:
+         pygame.display.flip()
+         self.full_frames += 1
+         self.pixels_updated += pygame.display.get_surface().get_width() * pygame.display.get_surface().get_height()
+      else:
+         update_rects = self.last_rects + self.rects
+         pygame.display.update(update_rects)
+         self.dirty_frames += 1
+         for rect in update_rects:
+            self.pixels_updated += rect.width * rect.height
+      self.last_rects = self.rects
+
+   # Get the renderer counters
+   def get_stats(self):
+      return {"full_frames": self.full_frames, "dirty_frames": self.dirty_frames, "pixels_updated": self.pixels_updated}
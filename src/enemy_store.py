@@ -0,0 +1,154 @@
+# Structure-of-arrays enemy store.
+#
+# Alternative enemy backend that keeps enemy positions, speeds, path IDs,
+# damage and score in contiguous NumPy arrays. All enemies are advanced in
+# one vectorized step per frame, off-screen and killed enemies are dropped
+# by compacting the arrays, and the sprites' positions and headings are only
+# written back so that rendering and collision detection keep working
+# unchanged.
+#
+# Movement matches Enemy.update(): every enemy's vertical step is looked up
+# in its flight path's step table, all paths stacked into one 2D array.
+
+#------------------------------
+# Imports
+#------------------------------
+try:
+   import numpy  # Required for this backend
+except ImportError:
+   numpy = None
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Initial number of slots, doubled whenever the store is full
+ENEMY_STORE_CAPACITY = 256
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Enemy Store Class
+class EnemyStore(object):
+   def __init__(self, flight_paths, capacity=ENEMY_STORE_CAPACITY):
+      # Step table of every flight path, one row per path ID
+      self.steps = numpy.array(flight_paths.get_table(), dtype=numpy.int64)
+      self.x_min = flight_paths.path_list[0].x_min
+      self.count = 0
+      self.capacity = 0
+      self.x = None
+      self.y = None
+      self.width = None
+      self.speed = None
+      self.path = None
+      self.dmg = None
+      self.score = None
+      # Sprite owning each slot, used for rect sync and kill()
+      self.sprites = []
+      self.grow(capacity)
+
+   # Resize every array to a new capacity, keeping the live entries
+   def grow(self, capacity):
+      def resize(old):
+         new = numpy.zeros(capacity, dtype=numpy.int64)
+         if old is not None:
+            new[:self.count] = old[:self.count]
+         return new
+      self.x = resize(self.x)
+      self.y = resize(self.y)
+      self.width = resize(self.width)
+      self.speed = resize(self.speed)
+      self.path = resize(self.path)
+      self.dmg = resize(self.dmg)
+      self.score = resize(self.score)
+      self.sprites.extend([None] * (capacity - self.capacity))
+      self.capacity = capacity
+
+   # Add a freshly spawned enemy sprite
+   def add(self, sprite, path_id):
+      if self.count == self.capacity:
+         self.grow(self.capacity * 2)
+      slot = self.count
+      self.x[slot] = sprite.body.x
+      self.y[slot] = sprite.body.y
+      self.width[slot] = sprite.body.width
+      self.speed[slot] = sprite.speed
+      self.path[slot] = path_id
+      self.dmg[slot] = sprite.dmg
+      self.score[slot] = sprite.score
+      self.sprites[slot] = sprite
+      # Pooled sprites can come back while a stale slot still points at them
+      sprite.store_slot = slot
+      self.count += 1
+
+   # Move every enemy one frame, drop the dead ones and sync the sprites
+   def update(self):
+      n = self.count
+      if n == 0:
+         return
+      x = self.x[:n]
+      y = self.y[:n]
+      path = self.path[:n]
+
+      # Vertical step on each path, from the position before moving
+      # (columns outside the tables use the nearest edge)
+      column = numpy.clip(x - self.x_min, 0, self.steps.shape[1] - 1)
+      dy = self.steps[path, column]
+
+      x -= self.speed[:n]
+      y += dy
+
+      # Keep enemies that are on screen and haven't been killed elsewhere
+      onscreen = (x + self.width[:n]) >= 0
+      keep = onscreen.copy()
+      i = 0
+      for sprite, visible in zip(self.sprites[:n], onscreen.tolist()):
+         # A stale slot's sprite may have been killed and respawned from the pool
+         if sprite.store_slot != i or sprite.alive() == False:
+            keep[i] = False
+         elif visible == False:
+            # Remove the sprite when it passes the left edge of the screen
+            sprite.kill()
+            keep[i] = False
+         i += 1
+
+      self.compact(keep)
+      # Steps of the kept enemies, to turn them to their heading
+      dy = dy[keep]
+
+      # Write positions and headings back to the sprites
+      slot = 0
+      for sprite, left, top, speed, step_dy in zip(self.sprites[:self.count], self.x[:self.count].tolist(), self.y[:self.count].tolist(), self.speed[:self.count].tolist(), dy.tolist()):
+         sprite.body.x = left
+         sprite.body.y = top
+         sprite.face(-speed, step_dy)
+         sprite.store_slot = slot
+         slot += 1
+
+   # Move the kept entries to the front of every array
+   def compact(self, keep):
+      n = self.count
+      kept = int(numpy.count_nonzero(keep))
+      if kept == n:
+         return
+      for array in (self.x, self.y, self.width, self.speed, self.path, self.dmg, self.score):
+         array[:kept] = array[:n][keep]
+      sprites = [sprite for sprite, k in zip(self.sprites[:n], keep.tolist()) if k == True]
+      self.sprites[:kept] = sprites
+      for slot in range(kept, n):
+         self.sprites[slot] = None
+      self.count = kept
+
+   # Get the damage and score of the enemy in a slot
+   def get_dmg(self, slot):
+      return int(self.dmg[slot])
+
+   def get_score(self, slot):
+      return int(self.score[slot])
+
+   # Drop every enemy
+   def clear(self):
+      for slot in range(self.count):
+         self.sprites[slot] = None
+      self.count = 0
@@ -0,0 +1,184 @@
+# Data-driven flight paths.
+#
+# Trajectories are defined in a JSON file rather than in code. A path is a
+# vertical step profile: how many pixels a sprite on it moves up or down on
+# a tick, given the screen column (x) it's in at the start of the tick. The
+# horizontal speed is the sprite's own, so fast and slow sprites trace the
+# same curve.
+#
+# Every path is compiled once at load time into a table of whole-pixel
+# steps, one per column over the compiled range, shared by every sprite on
+# the path. Moving a sprite is then a table lookup and an add, with no trig
+# per sprite per tick. Steps are truncated toward zero, the same way
+# Rect.move_ip() truncates a fractional step.
+#
+# File format (x values are screen columns):
+#
+#   {
+#      "paths": {
+#         "<name>": {"kind": "ramp", "slope": -0.01, "offset": 0},
+#         "<name>": {"kind": "sine", "amplitude": 5, "period": 250, "phase": 0, "function": "sin"},
+#         "<name>": {"kind": "polyline", "points": [[x, step], ...]},
+#         "<name>": {"kind": "spline", "points": [[x, step], ...]}
+#      },
+#      "enemy_paths": ["<name>", ...]
+#   }
+#
+# - ramp:     slope * x + offset
+# - sine:     amplitude * sin(x / period + phase) ("function": "cos" for a cosine)
+# - polyline: straight lines between the points, level beyond the first and last
+# - spline:   Catmull-Rom curve through the points, level beyond the first and last
+#
+# Enemies spawn on the paths listed in enemy_paths; the other paths are still
+# compiled and can be looked up by name.
+
+#------------------------------
+# Imports
+#------------------------------
+import json  # Path file parsing
+import math  # Path functions
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Default path file location, relative to project top level directory
+FLIGHT_PATHS = "assets/paths.json"
+
+# Path kinds
+PATH_RAMP = "ramp"
+PATH_SINE = "sine"
+PATH_POLYLINE = "polyline"
+PATH_SPLINE = "spline"
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Step Table Class
+# Maps a column to its step, columns outside the compiled range use the nearest edge
+class StepTable(dict):
+   def __init__(self, table, x_min):
+      super(StepTable, self).__init__(zip(range(x_min, x_min + len(table)), table))
+      self.x_min = x_min
+      self.x_max = x_min + len(table) - 1
+
+   def __missing__(self, x):
+      return self[min(max(x, self.x_min), self.x_max)]
+
+# Flight Path Class
+class FlightPath(object):
+   def __init__(self, name, path_id, table, x_min):
+      self.name = name
+      # Index of the path in its file, for array-backed movement
+      self.id = path_id
+      # Whole-pixel vertical step for each column from x_min
+      self.table = table
+      self.x_min = x_min
+      self.x_max = x_min + len(table) - 1
+      # The same steps keyed by column, so moving a sprite is a single lookup
+      self.steps = StepTable(table, x_min)
+
+   # Get the vertical step of a sprite starting a tick in column x
+   def get_step(self, x):
+      return self.steps[x]
+
+# Flight Paths Class
+class FlightPaths(object):
+   def __init__(self):
+      # Compiled paths keyed by name, in file order
+      self.paths = {}
+      self.path_list = []
+      # Paths enemies spawn on
+      self.enemy_paths = []
+
+   # Load and compile every path in a file over columns x_min..x_max
+   def load(self, path, x_min, x_max):
+      with open(path, "r") as path_file:
+         data = json.load(path_file)
+      for name, path_info in data["paths"].items():
+         table = compile_path(path_info, x_min, x_max)
+         flight_path = FlightPath(name, len(self.path_list), table, x_min)
+         self.paths[name] = flight_path
+         self.path_list.append(flight_path)
+      self.enemy_paths = [self.paths[name] for name in data["enemy_paths"]]
+
+   # Get a compiled path by name
+   def get(self, name):
+      return self.paths[name]
+
+   # Get the step tables of every path, one row per path ID
+   def get_table(self):
+      return [flight_path.table for flight_path in self.path_list]
+
+#------------------------------
+# Functions
+#------------------------------
+
+# Build the whole-pixel step table of one path definition
+def compile_path(path_info, x_min, x_max):
+   kind = path_info["kind"]
+   columns = range(x_min, x_max + 1)
+   if kind == PATH_RAMP:
+      slope = path_info["slope"]
+      offset = path_info.get("offset", 0)
+      values = [slope * x + offset for x in columns]
+   elif kind == PATH_SINE:
+      amplitude = path_info["amplitude"]
+      period = path_info["period"]
+      phase = path_info.get("phase", 0)
+      function = math.sin
+      if path_info.get("function", "sin") == "cos":
+         function = math.cos
+      values = [amplitude * function(x / period + phase) for x in columns]
+   elif kind == PATH_POLYLINE:
+      points = sorted(path_info["points"])
+      values = [get_polyline_value(points, x) for x in columns]
+   elif kind == PATH_SPLINE:
+      points = sorted(path_info["points"])
+      values = [get_spline_value(points, x) for x in columns]
+   else:
+      raise ValueError("Unknown flight path kind: {}".format(kind))
+   return [int(value) for value in values]
+
+# Find the segment of a sorted point list holding x, as the index of its first point
+# (None when x is before the first point or after the last)
+def find_segment(points, x):
+   if x < points[0][0] or x > points[-1][0]:
+      return None
+   for i in range(len(points) - 1):
+      if x <= points[i + 1][0]:
+         return i
+   return len(points) - 2
+
+# Value of a polyline at x
+def get_polyline_value(points, x):
+   if len(points) == 1:
+      return points[0][1]
+   i = find_segment(points, x)
+   if i == None:
+      if x < points[0][0]:
+         return points[0][1]
+      return points[-1][1]
+   (x1, y1), (x2, y2) = points[i], points[i + 1]
+   if x2 == x1:
+      return y2
+   return y1 + (y2 - y1) * (x - x1) / (x2 - x1)
+
+# Value of a Catmull-Rom spline through the points at x
+def get_spline_value(points, x):
+   if len(points) < 3:
+      return get_polyline_value(points, x)
+   i = find_segment(points, x)
+   if i == None:
+      if x < points[0][0]:
+         return points[0][1]
+      return points[-1][1]
+   (x1, y1), (x2, y2) = points[i], points[i + 1]
+   if x2 == x1:
+      return y2
+   # The end points are repeated to get a tangent at the ends
+   y0 = points[max(i - 1, 0)][1]
+   y3 = points[min(i + 2, len(points) - 1)][1]
+   t = (x - x1) / (x2 - x1)
+   return 0.5 * ((2 * y1) + (y2 - y0) * t + (2 * y0 - 5 * y1 + 4 * y2 - y3) * t * t + (3 * y1 - y0 - 3 * y2 + y3) * t * t * t)
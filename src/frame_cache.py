@@ -0,0 +1,151 @@
+# Shared animation frame cache.
+#
+# Every image is decoded, converted to the display format and colorkeyed
+# exactly once. Sprites only keep references to the shared surfaces, so
+# advancing an animation or spawning a new sprite never touches the disk.
+#
+# The hit/miss counters can be used to check that no images are loaded
+# from disk once the cache has been warmed up. When an atlas is attached,
+# frames it provides are taken from its sheets instead of individual files,
+# and images decoded ahead of time (e.g. by the asset loader) are only
+# converted instead of being read from disk.
+#
+# The mask registry does the same for collision masks: one mask per
+# distinct frame, built at load time and swapped together with the surface.
+
+#------------------------------
+# Imports
+#------------------------------
+import pygame  # Import the pygame library
+
+from pygame.locals import (
+   RLEACCEL    # Accelerated rendering parameter for non-accelerated displays
+)
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Frame Cache Class
+class FrameCache(object):
+   def __init__(self):
+      # Surfaces keyed by (image path, colorkey)
+      self.frames = {}
+      self.hits = 0
+      self.misses = 0
+      # Number of misses served from the atlas rather than the disk
+      self.atlas_frames = 0
+      # Number of misses read from disk
+      self.disk_loads = 0
+      # Optional sprite-sheet atlas
+      self.atlas = None
+      # Optional already decoded images keyed by path
+      self.decoded = None
+
+   # Serve frames from a sprite-sheet atlas when it has them
+   def attach_atlas(self, atlas):
+      self.atlas = atlas
+
+   # Use images that were already decoded (None to stop)
+   def attach_decoded(self, images):
+      self.decoded = images
+
+   # Get the shared surface for an image, decoding it on first use
+   def get(self, path, colorkey):
+      key = (path, colorkey)
+      surf = self.frames.get(key)
+      if surf == None:
+         self.misses += 1
+         if self.atlas != None and self.atlas.has_frame(path) and self.atlas.get_colorkey(path) == colorkey:
+            # Subsurface of an already loaded sheet
+            surf = self.atlas.get_frame(path)
+            self.atlas_frames += 1
+         else:
+            image = None
+            if self.decoded != None:
+               image = self.decoded.get(path)
+            if image == None:
+               image = pygame.image.load(path)
+               self.disk_loads += 1
+            surf = image.convert()
+            surf.set_colorkey(colorkey, RLEACCEL)
+         self.frames[key] = surf
+      else:
+         self.hits += 1
+      return surf
+
+   # Decode a list of images up front (call after the display is created)
+   def preload(self, paths, colorkey):
+      for path in paths:
+         if (path, colorkey) not in self.frames:
+            self.get(path, colorkey)
+
+   # Drop every cached surface
+   def clear(self):
+      self.frames.clear()
+
+   # Reset the hit/miss counters, e.g. once warm-up has finished
+   def reset_stats(self):
+      self.hits = 0
+      self.misses = 0
+      self.atlas_frames = 0
+      self.disk_loads = 0
+
+   # Get the cache counters
+   def get_stats(self):
+      return {"frames": len(self.frames), "hits": self.hits, "misses": self.misses, "atlas_frames": self.atlas_frames, "disk_loads": self.disk_loads}
+
+# Mask Registry Class
+class MaskRegistry(object):
+   def __init__(self, cache):
+      # Frames are taken from the given frame cache
+      self.cache = cache
+      # Masks keyed by (image path, colorkey)
+      self.masks = {}
+      self.hits = 0
+      self.misses = 0
+
+   # Get the shared collision mask for an image, building it on first use
+   def get(self, path, colorkey):
+      key = (path, colorkey)
+      mask = self.masks.get(key)
+      if mask == None:
+         self.misses += 1
+         mask = pygame.mask.from_surface(self.cache.get(path, colorkey))
+         self.masks[key] = mask
+      else:
+         self.hits += 1
+      return mask
+
+   # Register a mask built elsewhere (e.g. baked into the asset pack)
+   def add(self, path, colorkey, mask):
+      self.masks[(path, colorkey)] = mask
+
+   # Build the masks for a list of images up front
+   def preload(self, paths, colorkey):
+      for path in paths:
+         if (path, colorkey) not in self.masks:
+            self.get(path, colorkey)
+
+   # Drop every cached mask
+   def clear(self):
+      self.masks.clear()
+
+   # Reset the hit/miss counters
+   def reset_stats(self):
+      self.hits = 0
+      self.misses = 0
+
+   # Get the registry counters
+   def get_stats(self):
+      return {"masks": len(self.masks), "hits": self.hits, "misses": self.misses}
+
+#------------------------------
+# Globals
+#------------------------------
+
+# Process-wide cache shared by all sprites
+frame_cache = FrameCache()
+
+# Process-wide collision masks, one per cached frame
+mask_registry = MaskRegistry(frame_cache)
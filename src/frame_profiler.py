@@ -0,0 +1,317 @@
+# Per-phase frame timing.
+#
+# The game loop marks the end of each phase (event pump, updates, drawing,
+# collisions, HUD, flip...) and the profiler records the time since the
+# previous mark under that phase's name. Every phase keeps a rolling window
+# of recent timings for the in-game overlay and a histogram over the whole
+# session, which can be dumped as JSON or CSV on exit.
+#
+# Every phase gets one sample per rendered frame: phases marked several
+# times in a frame (those inside the fixed-timestep tick loop, which can run
+# any number of ticks per frame) are added up over the frame, and phases not
+# marked in a frame (no tick ran) count as 0, so the phases of a frame add
+# up to its "frame" time.
+#
+# Besides the phase timings, the game can sample other values once per
+# frame (e.g. HUD re-renders per second), which are shown under the phases.
+#
+# When the profiler is disabled every call returns straight away, so the
+# instrumentation can stay in the loop at close to zero cost.
+
+#------------------------------
+# Imports
+#------------------------------
+import time         # High resolution timer
+import json         # JSON dump
+import csv          # CSV dump
+import collections  # Rolling windows
+import pygame       # Import the pygame library
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Number of frames kept in each rolling window
+PROFILE_HISTORY = 120
+
+# Histogram bucket upper edges (ms), the last bucket catches everything else
+PROFILE_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 66]
+
+# Frame budget (ms) the overlay bars are scaled to when there's no frame rate cap
+PROFILE_BUDGET_MS = 1000 / 60
+
+# Number of frames between overlay text refreshes
+OVERLAY_REFRESH_FRAMES = 15
+
+# Overlay colors
+OVERLAY_BG = (0, 0, 0, 160)
+OVERLAY_TEXT = (255, 255, 255)
+OVERLAY_BAR = (255, 128, 0)
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Phase Stats Class
+class PhaseStats(object):
+   def __init__(self, history):
+      self.recent = collections.deque(maxlen=history)
+      self.histogram = [0] * (len(PROFILE_BUCKETS_MS) + 1)
+      self.count = 0
+      self.total = 0.0
+      self.max = 0.0
+
+   def add(self, ms):
+      self.recent.append(ms)
+      self.count += 1
+      self.total += ms
+      if ms > self.max:
+         self.max = ms
+      bucket = 0
+      for edge in PROFILE_BUCKETS_MS:
+         if ms <= edge:
+            break
+         bucket += 1
+      self.histogram[bucket] += 1
+
+   # Mean of the rolling window
+   def recent_mean(self):
+      if len(self.recent) == 0:
+         return 0.0
+      return sum(self.recent) / len(self.recent)
+
+   # Percentile of the rolling window
+   def recent_percentile(self, pct):
+      if len(self.recent) == 0:
+         return 0.0
+      ordered = sorted(self.recent)
+      return ordered[int(round((pct / 100) * (len(ordered) - 1)))]
+
+   def summary(self):
+      return {
+         "count": self.count,
+         "mean_ms": self.total / self.count if self.count > 0 else 0.0,
+         "max_ms": self.max,
+         "recent_mean_ms": self.recent_mean(),
+         "recent_p95_ms": self.recent_percentile(95),
+         "histogram": self.histogram
+      }
+
+# Value Stats Class
+class ValueStats(object):
+   def __init__(self):
+      self.last = 0
+      self.count = 0
+      self.total = 0.0
+      self.max = 0
+
+   def add(self, value):
+      self.last = value
+      self.count += 1
+      self.total += value
+      if self.count == 1 or value > self.max:
+         self.max = value
+
+   def summary(self):
+      return {
+         "count": self.count,
+         "last": self.last,
+         "mean": self.total / self.count if self.count > 0 else 0.0,
+         "max": self.max
+      }
+
+# Frame Profiler Class
+class FrameProfiler(object):
+   def __init__(self, history=PROFILE_HISTORY):
+      self.enabled = False
+      self.overlay = False
+      self.history = history
+      # Stats keyed by phase name, in the order the phases were first seen
+      self.phases = collections.OrderedDict()
+      self.frames = 0
+      self.frame_start = 0.0
+      self.last = 0.0
+      # Whether the current frame is being timed (begin_frame ran with timing on)
+      self.in_frame = False
+      # Time of each phase so far this frame
+      self.pending = collections.OrderedDict()
+      # Frame budget (ms) of the render frame rate cap, None when uncapped
+      self.budget_ms = None
+      # Sampled values keyed by name, in the order they were first seen
+      self.values = collections.OrderedDict()
+      # Named sets of counters added up outside the frame loop (e.g. menus)
+      self.counters = collections.OrderedDict()
+      # Cached overlay surface, re-rendered every few frames
+      self.font = None
+      self.overlay_surf = None
+
+   # Turn timing on or off
+   def enable(self, enabled=True):
+      self.enabled = enabled
+      if enabled == False:
+         self.in_frame = False
+
+   # Set the frame budget (ms) the overlay bars are scaled to, None when uncapped
+   def set_budget(self, budget_ms):
+      self.budget_ms = budget_ms
+      self.overlay_surf = None
+
+   # Show or hide the overlay (showing it also turns timing on)
+   def toggle_overlay(self):
+      self.overlay = not self.overlay
+      if self.overlay == True:
+         self.enabled = True
+      self.overlay_surf = None
+
+   # Start timing a frame (timing turned on during a frame starts with the next one)
+   def begin_frame(self):
+      self.in_frame = self.enabled
+      if self.in_frame == False:
+         return
+      self.frame_start = time.perf_counter()
+      self.last = self.frame_start
+      self.pending.clear()
+
+   # Add the time since the previous mark to a phase's time this frame
+   def mark(self, name):
+      if self.in_frame == False:
+         return
+      now = time.perf_counter()
+      self.pending[name] = self.pending.get(name, 0.0) + (now - self.last) * 1000
+      self.last = now
+
+   # Record every phase's time this frame, and the whole frame
+   def end_frame(self):
+      if self.in_frame == False:
+         return
+      self.pending["frame"] = (time.perf_counter() - self.frame_start) * 1000
+      for name, stats in self.phases.items():
+         stats.add(self.pending.pop(name, 0.0))
+      for name, ms in self.pending.items():
+         self.record(name, ms)
+      self.pending.clear()
+      self.frames += 1
+      self.in_frame = False
+
+   def record(self, name, ms):
+      stats = self.phases.get(name)
+      if stats == None:
+         stats = PhaseStats(self.history)
+         self.phases[name] = stats
+      stats.add(ms)
+
+   # Sample a value, by calling function() (not called when the frame isn't timed)
+   def sample(self, name, function):
+      if self.in_frame == False:
+         return
+      stats = self.values.get(name)
+      if stats == None:
+         stats = ValueStats()
+         self.values[name] = stats
+      stats.add(function())
+
+   # Add values to a named set of counters (always recorded, even when disabled)
+   def add_counters(self, name, values):
+      counters = self.counters.get(name)
+      if counters == None:
+         counters = collections.OrderedDict()
+         self.counters[name] = counters
+      for key, value in values.items():
+         counters[key] = counters.get(key, 0) + value
+
+   # Draw the overlay in the bottom left corner of a surface
+   # Returns the area drawn, or None when the overlay is hidden
+   def draw(self, surf):
+      if self.overlay == False:
+         return None
+      if self.overlay_surf == None or (self.frames % OVERLAY_REFRESH_FRAMES) == 0:
+         self.overlay_surf = self.render_overlay()
+      return surf.blit(self.overlay_surf, (5, surf.get_height() - self.overlay_surf.get_height() - 5))
+
+   # Load the overlay font up front, so showing the overlay doesn't hit the disk
+   def load_font(self):
+      if self.font == None:
+         self.font = pygame.font.SysFont("Arial", 12)
+
+   def render_overlay(self):
+      self.load_font()
+      line_height = self.font.get_linesize()
+      width = 260
+      rows = len(self.phases) + 1
+      if len(self.values) > 0:
+         rows += len(self.values) + 1
+      height = rows * line_height + 6
+      overlay_surf = pygame.Surface((width, height), pygame.SRCALPHA)
+      overlay_surf.fill(OVERLAY_BG)
+      budget_ms = self.budget_ms
+      if budget_ms == None:
+         budget_ms = PROFILE_BUDGET_MS
+
+      # Columns: phase name, rolling mean and rolling p95 (all per frame)
+      columns = [("phase / frame", 4), ("mean ms", 150), ("p95 ms", 215)]
+      for title, x in columns:
+         overlay_surf.blit(self.font.render(title, True, OVERLAY_TEXT), (x, 3))
+      y = 3 + line_height
+      for name, stats in self.phases.items():
+         mean = stats.recent_mean()
+         # Bar scaled so the frame budget spans the width
+         bar_width = min(int(mean / budget_ms * (width - 8)), width - 8)
+         pygame.draw.rect(overlay_surf, OVERLAY_BAR, pygame.Rect(4, y + line_height - 3, bar_width, 2))
+         values = [name, "{:.2f}".format(mean), "{:.2f}".format(stats.recent_percentile(95))]
+         for value, (title, x) in zip(values, columns):
+            overlay_surf.blit(self.font.render(value, True, OVERLAY_TEXT), (x, y))
+         y += line_height
+
+      # Sampled values: name, mean over the session and the latest
+      if len(self.values) > 0:
+         for title, (phase_title, x) in zip(["value", "mean", "last"], columns):
+            overlay_surf.blit(self.font.render(title, True, OVERLAY_TEXT), (x, y))
+         y += line_height
+      for name, stats in self.values.items():
+         values = [name, "{:.1f}".format(stats.summary()["mean"]), "{:.1f}".format(stats.last)]
+         for value, (title, x) in zip(values, columns):
+            overlay_surf.blit(self.font.render(value, True, OVERLAY_TEXT), (x, y))
+         y += line_height
+      return overlay_surf
+
+   # Get a summary of every phase
+   def get_stats(self):
+      return {
+         "frames": self.frames,
+         "budget_ms": self.budget_ms,
+         "buckets_ms": PROFILE_BUCKETS_MS,
+         "phases": {name: stats.summary() for name, stats in self.phases.items()},
+         "values": {name: stats.summary() for name, stats in self.values.items()},
+         "counters": {name: dict(counters) for name, counters in self.counters.items()}
+      }
+
+   # Write the summary to a file, as CSV if the name ends in .csv, otherwise JSON
+   def dump(self, path):
+      stats = self.get_stats()
+      if path.endswith(".csv"):
+         with open(path, "w", newline="") as dump_file:
+            writer = csv.writer(dump_file)
+            bucket_names = ["le_{}ms".format(edge) for edge in PROFILE_BUCKETS_MS] + ["gt_{}ms".format(PROFILE_BUCKETS_MS[-1])]
+            writer.writerow(["phase", "count", "mean_ms", "max_ms", "recent_mean_ms", "recent_p95_ms"] + bucket_names)
+            for name, phase in stats["phases"].items():
+               writer.writerow([name, phase["count"], phase["mean_ms"], phase["max_ms"], phase["recent_mean_ms"], phase["recent_p95_ms"]] + phase["histogram"])
+            writer.writerow([])
+            writer.writerow(["value", "count", "mean", "max", "last"])
+            for name, value in stats["values"].items():
+               writer.writerow([name, value["count"], value["mean"], value["max"], value["last"]])
+            writer.writerow([])
+            writer.writerow(["counters", "name", "value"])
+            for counters_name, counters in stats["counters"].items():
+               for name, value in counters.items():
+                  writer.writerow([counters_name, name, value])
+      else:
+         with open(path, "w") as dump_file:
+            json.dump(stats, dump_file, indent=3)
+            dump_file.write("\n")
+
+#------------------------------
+# Globals
+#------------------------------
+
+# Process-wide profiler used by the game loop
+frame_profiler = FrameProfiler()
@@ -20,22 +20,44 @@
 #------------------------------
 # Imports
 #------------------------------
-import pygame  # Import the pygame library
-import random  # Random number generation
-import time    # Sleep functions
-import math    # Maths
+import pygame   # Import the pygame library
+import random   # Random number generation
+import time     # Frame timing
+import math     # Maths
+import os       # File checks and SDL driver selection
+import sys      # Exit status
+import argparse # Command line options
+import collections # Re-render timestamps
+
+from frame_cache import frame_cache, mask_registry  # Shared animation frames and masks
+from atlas import Atlas, ATLAS_MANIFEST, read_manifest, get_frame_colorkeys  # Sprite-sheet atlas
+from asset_loader import AssetLoader, ASSET_IMAGE, ASSET_SOUND  # Parallel asset decoding
+from asset_pack import AssetPack, ASSET_PACK        # Baked asset pack
+from sprite_pool import PooledSprite, SpritePool    # Recycled sprites
+from particles import ExplosionSystem               # Batched explosions
+from spatial_hash import SpatialHash                # Collision broadphase
+from radius_query import radius_kills               # Wave/Shield area kills
+from enemy_store import EnemyStore, numpy           # Array-backed enemy movement
+from rotation_cache import RotationCache            # Pre-rendered enemy headings
+from spawn_scheduler import SpawnScheduler, SpawnRule  # Tick-based spawning
+from quality_governor import QualityGovernor, QUALITY_SHORT_EXPLOSIONS, QUALITY_NO_PEW, QUALITY_SIMPLE_WAVES  # Adaptive quality
+from flight_paths import FlightPaths, FLIGHT_PATHS  # Data-driven flight paths
+from frame_profiler import frame_profiler           # Per-phase frame timing
+from dirty_renderer import DirtyRenderer            # Dirty-rectangle rendering
+from render_queue import RenderQueue                # Layered, batched drawing
+from transitions import Transitions                 # Timed state transitions
+from menu_scene import MenuScene, MENU_CANCEL, MENU_QUIT  # Event-driven menus
+from replay import InputRecorder, Replay            # Input recording and replay
+from audio import AudioManager, AUDIO_MUSIC, AUDIO_WEAPONS, AUDIO_EXPLOSIONS, AUDIO_UI  # Sound playback
 
 # Import pygame.locals for easier access to key coordinates
 from pygame.locals import (
-   RLEACCEL,   # Accelerated rendering parameter for non-accelerated displays
    K_UP,       # UP Key
    K_DOWN,     # DOWN Key
    K_LEFT,     # LEFT Key
    K_RIGHT,    # RIGHT Key
    K_ESCAPE,   # ESC Key
    K_SPACE,    # Space Key
-   K_RETURN,   # RETURN Key
-   K_KP_ENTER, # ENTER Key
    K_w,        # W Key
    K_s,        # S Key
    K_a,        # A Key
@@ -49,8 +71,8 @@ from pygame.locals import (
    K_2,        # 2 Key
    K_3,        # 3 Key
    K_4,        # 4 Key
-   KEYDOWN,    # Keypress Event
-   QUIT        # Quit Event
+   K_F3,       # F3 Key
+   KEYDOWN     # Keypress Event
 )
 
 #------------------------------
@@ -137,8 +159,13 @@ orb_mini_imgs = [ORB_RED_MINI_IMG, ORB_YELLOW_MINI_IMG, ORB_BLUE_MINI_IMG, ORB_G
 # Array of orb score values
 orb_score = [50, 100, 200, 500]
 
-# Object Movement patterns
-movement_pattern = ["LINEAR", "SINE", "COSINE", "RISE", "FALL"]
+# Flight paths bullets are fired on (enemy paths are listed in the path file)
+PATH_LINEAR = "LINEAR"
+PATH_RISE = "RISE"
+PATH_FALL = "FALL"
+
+# Columns beyond each side of the screen covered by the flight path tables
+PATH_MARGIN = 256
 
 # Location of audio assets, relative to project top level directory
 MUSIC_SND   = "assets/audio/music.wav"
@@ -151,6 +178,27 @@ BAD_SND     = "assets/audio/bad.wav"
 PEW_SND     = "assets/audio/pew.wav"
 MENU_SND    = "assets/audio/menu_music.ogg"
 
+# Shortest time (ms) between two pews, one every third shot at 30 ticks/s
+PEW_MIN_INTERVAL = 100
+
+# Every image (with its colorkey) and sound the game uses, all decoded at
+# startup so the game loop never reads from disk
+# (MUSIC_SND is streamed by pygame.mixer.music, so it isn't in here)
+ASSET_MANIFEST = (
+   [(ASSET_IMAGE, path, COLOR_WHITE) for path in plane_animation_imgs] +
+   [(ASSET_IMAGE, path, COLOR_BLACK) for path in bullet_animation_imgs] +
+   [(ASSET_IMAGE, path, COLOR_WHITE) for path in explosion_animation_imgs] +
+   [(ASSET_IMAGE, path, COLOR_WHITE) for path in enemy_imgs] +
+   [(ASSET_IMAGE, path, COLOR_BLACK) for path in orb_imgs] +
+   [(ASSET_IMAGE, path, COLOR_BLACK) for path in orb_mini_imgs] +
+   [(ASSET_IMAGE, path, COLOR_WHITE) for path in cloud_imgs] +
+   [(ASSET_SOUND, path, None) for path in [PLANE_SND, BOOM_SND, GAMOVR_SND, DING_SND, POWERUP_SND, BAD_SND, PEW_SND, MENU_SND]]
+)
+
+# Loading screen progress bar
+LOAD_BAR_WIDTH = 400
+LOAD_BAR_HEIGHT = 20
+
 # Player health bounds
 PLAYER_HEALTH_MAX = 100
 PLAYER_HEALTH_MIN = 0
@@ -160,6 +208,80 @@ MAX_POWER = 1
 # Max of 1 of each type, no stacking
 MAX_POWERUPS = 1
 
+# Number of sprites built up front for each pool
+BULLET_POOL_SIZE = 64
+ENEMY_POOL_SIZE = 32
+
+# Move enemies with the NumPy structure-of-arrays backend instead of Enemy.update()
+USE_ENEMY_STORE = False
+
+# Spawn kinds for enemies, clouds and orbs
+SPAWN_ENEMY = "enemy"
+SPAWN_CLOUD = "cloud"
+SPAWN_ORB = "orb"
+
+# Spawn intervals (ms) for each spawn kind
+spawn_intervals = [(SPAWN_ENEMY, 250), (SPAWN_CLOUD, 2000), (SPAWN_ORB, 15000)]
+
+# Random spread of every spawn interval, as a fraction of it
+SPAWN_JITTER = 0.2
+
+# Enemies come faster as the score grows: their interval has halved at
+# ENEMY_RAMP_SCORE points, and never gets shorter than ENEMY_MIN_INTERVAL (ms)
+# unless the base interval already is
+ENEMY_RAMP_SCORE = 5000
+ENEMY_MIN_INTERVAL = 100
+
+# Random number generator for all gameplay randomness, seeded by init()
+rng = random.Random()
+
+# Random number generator for the scenery (clouds), kept apart from the
+# gameplay one so the quality governor can drop clouds without changing
+# the game
+scenery_rng = random.Random()
+
+# Headless mode: SDL dummy drivers and no frame pacing
+HEADLESS = False
+
+# Simulation ticks per second. This is fixed, not a setting: movement,
+# animation and wave growth steps are all per tick, tuned for 30 ticks/s,
+# while spawns and transitions are timed in ms, so a different rate would
+# change the speed of the game and its pacing against the spawns
+SIM_TICK_RATE = GAME_FPS_30
+
+# Render frame rate cap (0 draws as fast as the display allows)
+RENDER_FPS = GAME_FPS_60
+
+# Longest frame time fed to the simulation (seconds), so a stall doesn't
+# turn into a long burst of catch-up ticks
+MAX_FRAME_TIME = 0.25
+
+# Game over sequence (ms after the player dies): the game over sound plays,
+# then the game ends, with the world still running in between
+GAME_OVER_SOUND = "game_over_sound"
+GAME_OVER_SOUND_DELAY = 1000
+GAME_OVER_END = "game_over_end"
+GAME_OVER_END_DELAY = 4000
+
+# Delay (ms) before a menu closes after choosing an option
+MENU_CLOSE_DELAY = 500
+
+# Only redraw and update the parts of the screen that changed
+USE_DIRTY_RECTS = False
+
+# Cut non-essential work when frames run over the frame rate cap's budget
+USE_QUALITY_GOVERNOR = True
+
+# Render layers, back to front
+LAYER_CLOUDS = "clouds"
+LAYER_ORBS = "orbs"
+LAYER_ENEMIES = "enemies"
+LAYER_BULLETS = "bullets"
+LAYER_PLAYER = "player"
+LAYER_EFFECTS = "effects"
+LAYER_HUD = "hud"
+RENDER_LAYERS = [LAYER_CLOUDS, LAYER_ORBS, LAYER_ENEMIES, LAYER_BULLETS, LAYER_PLAYER, LAYER_EFFECTS, LAYER_HUD]
+
 #------------------------------
 # Classes
 #------------------------------
@@ -170,19 +292,14 @@ class Player(pygame.sprite.Sprite):
       super(Player, self).__init__()
       self.frame_cnt = 0
       self.img_cnt = 0
-      self.surf = pygame.image.load(plane_animation_imgs[self.img_cnt]).convert()
-      self.surf.set_colorkey(COLOR_WHITE, RLEACCEL)
+      self.surf = frame_cache.get(plane_animation_imgs[self.img_cnt], COLOR_WHITE)
       self.rect = self.surf.get_rect()
-      self.mask = pygame.mask.from_surface(self.surf)
+      self.mask = mask_registry.get(plane_animation_imgs[self.img_cnt], COLOR_WHITE)
       self.health = PLAYER_HEALTH_MAX
       self.exp = 0
       self.power = 0
-      self.health_bar = None
-      self.health_font = pygame.font.SysFont("Arial", 12)
-      self.health_text = None
       self.powerups = [0, 0, 0, 0]
       #self.powerups = [1, 1, 1, 1] # For Testing
-      self.shoot_cnt = 0
 
    # Move the Player based on user input
    def update(self, pressed_keys):
@@ -222,8 +339,8 @@ class Player(pygame.sprite.Sprite):
          self.img_cnt += 1
          if self.img_cnt == len(plane_animation_imgs) - 1:
             self.img_cnt = 0
-         self.surf = pygame.image.load(plane_animation_imgs[self.img_cnt]).convert()
-         self.surf.set_colorkey(COLOR_WHITE, RLEACCEL)
+         self.surf = frame_cache.get(plane_animation_imgs[self.img_cnt], COLOR_WHITE)
+         self.mask = mask_registry.get(plane_animation_imgs[self.img_cnt], COLOR_WHITE)
 
    # Increment the player's power
    def inc_power(self, amount):
@@ -259,56 +376,13 @@ class Player(pygame.sprite.Sprite):
    def get_health(self):
       return self.health
 
-   # Draw the player's health bar and power-ups
-   def draw_health_bar(self, surf):
-      # Set up bar size parameters
-      width = PLAYER_HEALTH_MAX
-      height = 20
-      bar_fill = (self.health / PLAYER_HEALTH_MAX) * width
-
-      # Create the rectangles
-      bar_rect = pygame.Rect(5, 5, width, height)
-      fill_rect = pygame.Rect(5, 5, bar_fill, height)
-      
-      # Get the health bar color
-      if self.health >= 80:
-         bar_color = COLOR_GREEN
-      elif self.health >= 60:
-         bar_color = COLOR_YEL_GRN
-      elif self.health >= 50:
-         bar_color = COLOR_YELLOW
-      elif self.health >= 40:
-         bar_color = COLOR_YEL_ORN
-      elif self.health >= 20:
-         bar_color = COLOR_ORANGE
-      else:
-         bar_color = COLOR_RED
-
-      # Draw the rectangles
-      pygame.draw.rect(surf, bar_color, fill_rect)
-      pygame.draw.rect(surf, COLOR_BLACK, bar_rect, 2)
-
-      # Draw the text value of the health
-      self.health_text = self.health_font.render("{}/{}".format(self.health, PLAYER_HEALTH_MAX), 1, COLOR_BLACK)
-      surf.blit(self.health_text, ((bar_rect.left + (bar_rect.width / 2) - (self.health_text.get_width() / 2)), (bar_rect.top + (bar_rect.height / 2) - (self.health_text.get_height() / 2))))
-
-      # Draw available power-ups
-      i = 0
-      for pwrup in self.powerups:
-         if pwrup > 0:
-            # Draw it
-            pwrup_img = pygame.image.load(orb_mini_imgs[i]).convert()
-            pwrup_img.set_colorkey(COLOR_BLACK, RLEACCEL)
-            surf.blit(pwrup_img, (bar_rect.left + 18 + (20 * i), (bar_rect.bottom + 5)))
-         i += 1
-
    # Shoot!
    def shoot(self):
       # Spawn bullets from the front right of the plane
       if self.power > 0:
-         new_bullet_1 = Bullet(self.rect.right - (self.rect.width / 4), self.rect.bottom - (self.rect.height / 6), movement_pattern[0])
-         new_bullet_2 = Bullet(self.rect.right - (self.rect.width / 4), self.rect.bottom - (self.rect.height / 6), movement_pattern[3])
-         new_bullet_3 = Bullet(self.rect.right - (self.rect.width / 4), self.rect.bottom - (self.rect.height / 6), movement_pattern[4])
+         new_bullet_1 = bullet_pool.acquire(self.rect.right - (self.rect.width / 4), self.rect.bottom - (self.rect.height / 6), flight_paths.get(PATH_LINEAR))
+         new_bullet_2 = bullet_pool.acquire(self.rect.right - (self.rect.width / 4), self.rect.bottom - (self.rect.height / 6), flight_paths.get(PATH_RISE))
+         new_bullet_3 = bullet_pool.acquire(self.rect.right - (self.rect.width / 4), self.rect.bottom - (self.rect.height / 6), flight_paths.get(PATH_FALL))
          bullets.add(new_bullet_1)
          all_sprites.add(new_bullet_1)
          bullets.add(new_bullet_2)
@@ -316,14 +390,13 @@ class Player(pygame.sprite.Sprite):
          bullets.add(new_bullet_3)
          all_sprites.add(new_bullet_3)
       else:
-         new_bullet = Bullet(self.rect.right - (self.rect.width / 4), self.rect.bottom - (self.rect.height / 6), movement_pattern[0])
+         new_bullet = bullet_pool.acquire(self.rect.right - (self.rect.width / 4), self.rect.bottom - (self.rect.height / 6), flight_paths.get(PATH_LINEAR))
          bullets.add(new_bullet)
          all_sprites.add(new_bullet)
 
-      # Don't play sound for every bullet
-      if self.shoot_cnt % 3 == 0:
+      # The audio manager keeps this from playing for every bullet
+      if governor.is_cut(QUALITY_NO_PEW) == False:
          pew_sound.play()
-      self.shoot_cnt += 1
 
    def use_power(self, power):
       if self.powerups[power] > 0:
@@ -347,23 +420,43 @@ class Player(pygame.sprite.Sprite):
 
 # Calculate the diagonal of the screen
 MAX_RADIUS = math.sqrt((SCREEN_WIDTH * SCREEN_WIDTH) + (SCREEN_HEIGHT * SCREEN_HEIGHT))
+# Ring line width (pixels), at full quality and with simple waves
+WAVE_WIDTH = 5
+WAVE_WIDTH_SIMPLE = 1
 # Wave/Ring Class
 class Wave(object):
    def __init__(self, center):
       self.center = center
       self.radius = 10
+      # Radius at the start of the last tick and the one to draw
+      self.prev_radius = self.radius
+      self.draw_radius = self.radius
       self.alive = True
       bad_sound.play()
 
+   # Keep the radius at the start of a tick, to interpolate from when drawing
+   def start_tick(self):
+      self.prev_radius = self.radius
+
    def update(self):
       if self.radius < MAX_RADIUS:
          self.radius += 15
       else:
          self.alive = False
 
+   # Set the radius to draw, between the last two ticks
+   def interpolate(self, alpha):
+      self.draw_radius = round(self.prev_radius + (self.radius - self.prev_radius) * alpha)
+
+   # Draw the ring, returns the rect drawn (None once the wave is over)
    def blit(self, surf):
       if self.alive == True:
-         self.circle = pygame.draw.circle(surf, COLOR_RED, self.center, self.radius, 5)
+         width = WAVE_WIDTH
+         if governor.is_cut(QUALITY_SIMPLE_WAVES) == True:
+            width = WAVE_WIDTH_SIMPLE
+         self.circle = pygame.draw.circle(surf, COLOR_RED, self.center, self.draw_radius, width)
+         return self.circle
+      return None
 
    def get_center(self):
       return self.center
@@ -385,8 +478,15 @@ class Shield(object):
       self.height = height
       self.radius = 125
       self.hp = SHIELD_HP_MAX
+      # Center at the start of the last tick and the one to draw
+      self.prev_center = self.center
+      self.draw_center = self.center
       bad_sound.play()
 
+   # Keep the center at the start of a tick, to interpolate from when drawing
+   def start_tick(self):
+      self.prev_center = self.center
+
    def update(self, pressed_keys):
       # Move with player
       if pressed_keys[K_UP] | pressed_keys[K_w]:
@@ -411,8 +511,15 @@ class Shield(object):
       # Update the center position
       self.center = (self.x, self.y)
 
+   # Set the center to draw, between the last two ticks (the same way the
+   # player's sprite is)
+   def interpolate(self, alpha):
+      self.draw_center = (round(self.prev_center[0] + (self.center[0] - self.prev_center[0]) * alpha), round(self.prev_center[1] + (self.center[1] - self.prev_center[1]) * alpha))
+
+   # Draw the shield, returns the rect drawn
    def blit(self, surf):
-      self.circle = pygame.draw.circle(surf, COLOR_BLUE, self.center, self.radius, self.hp + 1)
+      self.circle = pygame.draw.circle(surf, COLOR_BLUE, self.draw_center, self.radius, self.hp + 1)
+      return self.circle
 
    def get_center(self):
       return self.center
@@ -429,34 +536,30 @@ class Shield(object):
          self.hp = 0
 
 # Bullet Class
-class Bullet(pygame.sprite.Sprite):
+class Bullet(PooledSprite):
    def __init__(self, x, y, path):
       super(Bullet, self).__init__()
+      self.reset(x, y, path)
+
+   # Put the bullet back in its spawn state
+   def reset(self, x, y, path):
       self.frame_cnt = 0
       self.img_cnt = 0
-      self.surf = pygame.image.load(bullet_animation_imgs[self.img_cnt]).convert()
-      self.surf.set_colorkey(COLOR_BLACK, RLEACCEL)
+      self.surf = frame_cache.get(bullet_animation_imgs[self.img_cnt], COLOR_BLACK)
       self.rect = self.surf.get_rect(
          center = (
             # Spawn based on location of player
             x, y
          )
       )
-      self.mask = pygame.mask.from_surface(self.surf)
+      self.mask = mask_registry.get(bullet_animation_imgs[self.img_cnt], COLOR_BLACK)
       self.speed = 20
       self.dmg = 10
       self.path = path
 
    def update(self):
-      # Linear
-      if self.path == movement_pattern[0]:
-         self.rect.move_ip(self.speed, 0)
-      # Rising
-      elif self.path == movement_pattern[3]:
-         self.rect.move_ip(self.speed, -0.01 * self.rect.x)
-      # Falling
-      elif self.path == movement_pattern[4]:
-         self.rect.move_ip(self.speed, 0.01 * self.rect.x)
+      # Step along the flight path
+      self.rect.move_ip(self.speed, self.path.steps[self.rect.x])
 
       self.rect.move_ip(self.speed, 0)
       if self.rect.left > SCREEN_WIDTH:
@@ -469,83 +572,61 @@ class Bullet(pygame.sprite.Sprite):
          # Latch on the last image
          if self.img_cnt < len(bullet_animation_imgs) - 1:
             self.img_cnt += 1
-            self.surf = pygame.image.load(bullet_animation_imgs[self.img_cnt]).convert()
-            self.surf.set_colorkey(COLOR_BLACK, RLEACCEL)
+            self.surf = frame_cache.get(bullet_animation_imgs[self.img_cnt], COLOR_BLACK)
+            self.mask = mask_registry.get(bullet_animation_imgs[self.img_cnt], COLOR_BLACK)
 
    def get_center(self):
       return ((self.rect.right - (self.rect.width / 2)),(self.rect.bottom - (self.rect.height / 2)))
 
-# Explosion Class
-class Explosion(pygame.sprite.Sprite):
-   def __init__(self, x, y):
-      super(Explosion, self).__init__()
-      self.frame_cnt = 0
-      self.img_cnt = 0
-      self.surf = pygame.image.load(explosion_animation_imgs[self.img_cnt]).convert()
-      self.surf.set_colorkey(COLOR_WHITE, RLEACCEL)
-      self.rect = self.surf.get_rect(
-         center = (
-            # Spawn based on location of bullet
-            x, y
-         )
-      )
-      #self.mask = pygame.mask.from_surface(self.surf)
-
-   def update(self):
-      # Draw the correct sprite for the animation
-      self.frame_cnt += 1
-      if self.frame_cnt == EXPLOSION_FRAMES_PER_IMG:
-         self.frame_cnt = 0
-         # Latch on the last image
-         if self.img_cnt < len(explosion_animation_imgs) - 1:
-            self.img_cnt += 1
-            self.surf = pygame.image.load(explosion_animation_imgs[self.img_cnt]).convert()
-            self.surf.set_colorkey(COLOR_WHITE, RLEACCEL)
-         else:
-            self.kill()
-
 # Enemy Class
-class Enemy(pygame.sprite.Sprite):
+class Enemy(PooledSprite):
    def __init__(self):
       super(Enemy, self).__init__()
-      self.type = random.randint(0, len(enemy_imgs) - 1)
-      self.surf = pygame.image.load(enemy_imgs[self.type]).convert()
-      self.surf.set_colorkey(COLOR_WHITE, RLEACCEL)
-      self.rect = self.surf.get_rect(
+      self.reset()
+
+   # Put the enemy back in a new random spawn state
+   def reset(self):
+      self.type = rng.randint(0, len(enemy_imgs) - 1)
+      self.surf = frame_cache.get(enemy_imgs[self.type], COLOR_WHITE)
+      # The body is the unrotated footprint the flight path moves, the rect
+      # is the rotated sprite's, centered on it
+      self.body = self.surf.get_rect(
          center = (
-            random.randint(SCREEN_WIDTH + 20, SCREEN_WIDTH + 100),
-            random.randint(10, SCREEN_HEIGHT - 10)
+            rng.randint(SCREEN_WIDTH + 20, SCREEN_WIDTH + 100),
+            rng.randint(10, SCREEN_HEIGHT - 10)
          )
       )
-      self.mask = pygame.mask.from_surface(self.surf)
-      self.speed = random.randint(8, 20)
-      self.path = movement_pattern[random.randint(0, len(movement_pattern) - 1)]
+      self.rect = self.body.copy()
+      self.mask = mask_registry.get(enemy_imgs[self.type], COLOR_WHITE)
+      # Pre-rendered headings
+      self.rotations = rotation_cache.get(enemy_imgs[self.type], COLOR_WHITE)
+      self.angle = rotation_cache.get_index(-1, 0)
+      self.speed = rng.randint(8, 20)
+      self.path = flight_paths.enemy_paths[rng.randint(0, len(flight_paths.enemy_paths) - 1)]
       self.health = 1
       self.dmg = enemy_dmg[self.type]
       self.score = enemy_score[self.type]
 
-   # Move the sprite based on speed and pattern
+   # Move the sprite based on speed and flight path
    def update(self):
-      # Linear
-      if self.path == movement_pattern[0]:
-         self.rect.move_ip(-self.speed, 0)
-      # Sine Wave
-      elif self.path == movement_pattern[1]:
-         self.rect.move_ip(-self.speed, 5 * math.sin(self.rect.x / 250))
-      # Cosine Wave
-      elif self.path == movement_pattern[2]:
-         self.rect.move_ip(-self.speed, 5 * math.cos(self.rect.x / 250))
-      # Rising
-      elif self.path == movement_pattern[3]:
-         self.rect.move_ip(-self.speed, -0.01 * self.rect.x)
-      # Falling
-      elif self.path == movement_pattern[4]:
-         self.rect.move_ip(-self.speed, 0.01 * self.rect.x)
+      dy = self.path.steps[self.body.x]
+      self.body.move_ip(-self.speed, dy)
+      self.face(-self.speed, dy)
       
       # Remove the sprite when it passes the left edge of the screen
-      if self.rect.right < 0:
+      if self.body.right < 0:
          self.kill()
 
+   # Turn to the cached angle nearest to a velocity and center the sprite on its body
+   def face(self, dx, dy):
+      angle = rotation_cache.get_index(dx, dy)
+      if angle != self.angle:
+         self.angle = angle
+         self.surf = self.rotations[0][angle]
+         self.mask = self.rotations[1][angle]
+         self.rect.size = self.surf.get_size()
+      self.rect.center = self.body.center
+
    # Get amount of damage the enemy does
    def get_dmg(self):
       return self.dmg
@@ -560,17 +641,16 @@ class Enemy(pygame.sprite.Sprite):
 class Orb(pygame.sprite.Sprite):
    def __init__(self):
       super(Orb, self).__init__()
-      self.type = random.randint(0, len(orb_imgs) - 1)
-      self.surf = pygame.image.load(orb_imgs[self.type]).convert()
-      self.surf.set_colorkey(COLOR_BLACK, RLEACCEL)
+      self.type = rng.randint(0, len(orb_imgs) - 1)
+      self.surf = frame_cache.get(orb_imgs[self.type], COLOR_BLACK)
       self.rect = self.surf.get_rect(
          center = (
-            random.randint(SCREEN_WIDTH + 20, SCREEN_WIDTH + 100),
-            random.randint(0, SCREEN_HEIGHT)
+            rng.randint(SCREEN_WIDTH + 20, SCREEN_WIDTH + 100),
+            rng.randint(0, SCREEN_HEIGHT)
          )
       )
-      self.mask = pygame.mask.from_surface(self.surf)
-      self.speed = random.randint(5, 15)
+      self.mask = mask_registry.get(orb_imgs[self.type], COLOR_BLACK)
+      self.speed = rng.randint(5, 15)
 
    # Move the sprite based on speed
    # Remove the sprite when it passes the left edge of the screen
@@ -589,17 +669,16 @@ class Orb(pygame.sprite.Sprite):
 class Cloud(pygame.sprite.Sprite):
    def __init__(self):
       super(Cloud, self).__init__()
-      self.type = random.randint(0, len(cloud_imgs) - 1)
-      self.surf = pygame.image.load(cloud_imgs[self.type]).convert()
-      self.surf.set_colorkey(COLOR_WHITE, RLEACCEL)
+      self.type = scenery_rng.randint(0, len(cloud_imgs) - 1)
+      self.surf = frame_cache.get(cloud_imgs[self.type], COLOR_WHITE)
       # The starting position is randomly generated
       self.rect = self.surf.get_rect(
          center = (
-            random.randint(SCREEN_WIDTH + 20, SCREEN_WIDTH + 100),
-            random.randint(0, SCREEN_HEIGHT)
+            scenery_rng.randint(SCREEN_WIDTH + 20, SCREEN_WIDTH + 100),
+            scenery_rng.randint(0, SCREEN_HEIGHT)
          )
       )
-      self.speed = random.randint(2, 7)
+      self.speed = scenery_rng.randint(2, 7)
 
    # Move the cloud based on constant speed
    # Remove the cloud when it passes the left edge of the screen
@@ -611,21 +690,136 @@ class Cloud(pygame.sprite.Sprite):
 # Score Class
 class Score(object):
    def __init__(self):
-      self.font = pygame.font.SysFont("Arial", 25)
       self.total = 0
-      self.color = COLOR_BLACK
-      self.text = None
-
-   def update(self):
-      self.text = self.font.render("Score: {0}".format(self.total), 1, self.color)
 
    def add(self, amount):
       self.total += amount
       if self.total < 0:
          self.total = 0
 
-   def blit(self, surf):
-      surf.blit(self.text, ((SCREEN_WIDTH / 2) - (self.text.get_width() / 2), self.text.get_height()))
+# Health bar position and size
+HEALTH_BAR_X = 5
+HEALTH_BAR_Y = 5
+HEALTH_BAR_WIDTH = PLAYER_HEALTH_MAX
+HEALTH_BAR_HEIGHT = 20
+
+# Window (seconds) of the HUD re-renders per second counter
+HUD_RATE_WINDOW = 1.0
+
+# HUD Class
+# Keeps pre-composited surfaces for the score, the health bar and the
+# power-up tray, each re-rendered only when the value it shows changes
+class Hud(object):
+   def __init__(self):
+      self.score_font = pygame.font.SysFont("Arial", 25)
+      self.score_color = COLOR_BLACK
+      self.health_font = pygame.font.SysFont("Arial", 12)
+      self.reset()
+
+   # Forget the cached layers and the counters, for a new game
+   def reset(self):
+      # Value last rendered into each layer
+      self.score_total = None
+      self.health = None
+      self.powerups = None
+      # Cached layers
+      self.score_surf = None
+      self.health_surf = None
+      self.powerups_surf = None
+      # Re-render counters, and the times of the re-renders in the last window
+      self.renders = {"score": 0, "health": 0, "powerups": 0}
+      self.render_times = collections.deque()
+
+   # Re-render the layers whose values changed
+   def update(self, score, player):
+      if score.total != self.score_total:
+         self.score_total = score.total
+         self.score_surf = self.score_font.render("Score: {0}".format(self.score_total), 1, self.score_color)
+         self.count_render("score")
+      if player.health != self.health:
+         self.health = player.health
+         self.health_surf = self.render_health_bar(self.health)
+         self.count_render("health")
+      if player.powerups != self.powerups:
+         self.powerups = list(player.powerups)
+         self.powerups_surf = self.render_powerups(self.powerups)
+         self.count_render("powerups")
+
+   def count_render(self, layer):
+      now = time.perf_counter()
+      self.renders[layer] += 1
+      self.render_times.append(now)
+      self.prune_render_times(now)
+
+   # Drop the re-render times older than the window
+   def prune_render_times(self, now):
+      while len(self.render_times) > 0 and self.render_times[0] < now - HUD_RATE_WINDOW:
+         self.render_times.popleft()
+
+   # Draw the health bar and its text value
+   def render_health_bar(self, health):
+      layer = pygame.Surface((HEALTH_BAR_WIDTH, HEALTH_BAR_HEIGHT), pygame.SRCALPHA)
+      bar_fill = (health / PLAYER_HEALTH_MAX) * HEALTH_BAR_WIDTH
+
+      # Create the rectangles
+      bar_rect = pygame.Rect(0, 0, HEALTH_BAR_WIDTH, HEALTH_BAR_HEIGHT)
+      fill_rect = pygame.Rect(0, 0, bar_fill, HEALTH_BAR_HEIGHT)
+
+      # Get the health bar color
+      if health >= 80:
+         bar_color = COLOR_GREEN
+      elif health >= 60:
+         bar_color = COLOR_YEL_GRN
+      elif health >= 50:
+         bar_color = COLOR_YELLOW
+      elif health >= 40:
+         bar_color = COLOR_YEL_ORN
+      elif health >= 20:
+         bar_color = COLOR_ORANGE
+      else:
+         bar_color = COLOR_RED
+
+      # Draw the rectangles
+      pygame.draw.rect(layer, bar_color, fill_rect)
+      pygame.draw.rect(layer, COLOR_BLACK, bar_rect, 2)
+
+      # Draw the text value of the health
+      health_text = self.health_font.render("{}/{}".format(health, PLAYER_HEALTH_MAX), 1, COLOR_BLACK)
+      layer.blit(health_text, (((bar_rect.width / 2) - (health_text.get_width() / 2)), ((bar_rect.height / 2) - (health_text.get_height() / 2))))
+      return layer
+
+   # Draw the available power-ups, or None if there are none
+   def render_powerups(self, powerups):
+      if max(powerups) == 0:
+         return None
+      layer = pygame.Surface((18 + (20 * (len(powerups) - 1)) + 11, 11), pygame.SRCALPHA)
+      i = 0
+      for pwrup in powerups:
+         if pwrup > 0:
+            layer.blit(frame_cache.get(orb_mini_imgs[i], COLOR_BLACK), (18 + (20 * i), 0))
+         i += 1
+      return layer
+
+   # Get the cached layers as (image, position) blits
+   def get_blits(self):
+      blits = [(self.score_surf, ((SCREEN_WIDTH / 2) - (self.score_surf.get_width() / 2), self.score_surf.get_height()))]
+      blits.append((self.health_surf, (HEALTH_BAR_X, HEALTH_BAR_Y)))
+      if self.powerups_surf != None:
+         blits.append((self.powerups_surf, (HEALTH_BAR_X, HEALTH_BAR_Y + HEALTH_BAR_HEIGHT + 5)))
+      return blits
+
+   # Number of layer re-renders in the last second
+   def get_renders_per_second(self):
+      self.prune_render_times(time.perf_counter())
+      return len(self.render_times) / HUD_RATE_WINDOW
+
+   # Get the re-renders of each layer as flat counters
+   def get_counters(self):
+      return {layer + "_renders": count for layer, count in self.renders.items()}
+
+   # Get the HUD counters
+   def get_stats(self):
+      return {"renders": dict(self.renders), "renders_per_second": self.get_renders_per_second()}
 
 #------------------------------
 # Functions
@@ -636,114 +830,61 @@ class Score(object):
    # TODO play intro sequence
 
 # The start menu loop
-#def start_menu():
-   # TODO Draw game start menu
-
-# The pause menu loop
-def pause_menu():
-   # Game is paused
-   paused = True
-
-   # Return value to tell the game whether it should continue running
-   running = True
-
+# Returns whether to start the game (False quits)
+def start_menu():
    # Play the menu music
    menu_music.play(loops=-1)
 
-   # Set up the menu font
-   menu_font = pygame.font.SysFont('Arial', 25)
+   # Start from a clear sky
+   screen.fill(COLOR_SKY)
+   pygame.display.flip()
+
+   menu = MenuScene("start_menu", screen, menu_font, 'MAIN MENU', ['START', 'OPTIONS', 'QUIT'], ding_sound, bad_sound)
+
+   start = None
+   while start == None:
+      choice = menu.run(MENU_CLOSE_DELAY if HEADLESS == False else 0)
+      if choice == 0:
+         start = True
+      elif choice == 1:
+         start = options_menu()
+         if start == True:
+            start = None
+      else:
+         # QUIT, ESC or the window was closed
+         start = False
 
-   # Draw the menu
-   border_width = SCREEN_WIDTH / 4
-   border_height = SCREEN_HEIGHT / 3
-   window_width = border_width - 4
-   window_height = border_height - 4
-   # Draw the window border
-   border = pygame.draw.rect(screen, COLOR_BLACK, pygame.Rect((((SCREEN_WIDTH / 2) - (border_width / 2)), ((SCREEN_HEIGHT / 2) - (border_height / 2))), (border_width, border_height)), border_radius=8)
-   # Draw the window
-   window = pygame.draw.rect(screen, COLOR_GRAY, pygame.Rect((((SCREEN_WIDTH / 2) - (window_width / 2)), ((SCREEN_HEIGHT / 2) - (window_height / 2))), (window_width, window_height)), border_radius=8)
-
-   # Draw the menu text
-   paused_text = menu_font.render('PAUSED', True, COLOR_BLACK)
-   text_height = paused_text.get_height()
-   screen.blit(paused_text, (window.left + ((window.width - paused_text.get_width()) / 2), window.top + (text_height / 2)))
-
-   # Initialize the menu text
-   resume_text = menu_font.render('RESUME', True, COLOR_WHITE)
-   resume_text_hl = menu_font.render('RESUME', True, COLOR_YELLOW)
-   restart_text = menu_font.render('RESTART', True, COLOR_WHITE)
-   restart_text_hl = menu_font.render('RESTART', True, COLOR_YELLOW)
-   options_text = menu_font.render('OPTIONS', True, COLOR_WHITE)
-   options_text_hl = menu_font.render('OPTIONS', True, COLOR_YELLOW)
-   quit_text = menu_font.render('QUIT', True, COLOR_WHITE)
-   quit_text_hl = menu_font.render('QUIT', True, COLOR_YELLOW)
-
-   # Array of options (drawn from bottom up)
-   menu_options = [quit_text, options_text, restart_text, resume_text]
-   menu_options_hl = [quit_text_hl, options_text_hl, restart_text_hl, resume_text_hl]
-   menu_index = len(menu_options) - 1
-
-   while paused:
-      # Process all events in the event queue
-      for event in pygame.event.get():
-         # Did the user hit a key?
-         if event.type == KEYDOWN:
-            # Handle ESC keypress
-            if event.key == K_ESCAPE:
-               paused = False
-            # Handle UP keypress
-            elif event.key == K_UP:
-               if menu_index < (len(menu_options) - 1):
-                  menu_index += 1
-               else:
-                  menu_index = 0
-               ding_sound.play()
-            # Handle DOWN keypress
-            elif event.key == K_DOWN:
-               if menu_index > 0:
-                  menu_index -= 1
-               else:
-                  menu_index = len(menu_options) - 1
-               ding_sound.play()
-            # Handle ENTER|RETURN keypress
-            elif ((event.key == K_KP_ENTER) or (event.key == K_RETURN)):
-               if menu_index == 0:
-                  # QUIT case
-                  paused = False
-                  running = False
-               elif menu_index == 1:
-                  # TODO: OPTIONS case
-                  #options_menu()
-                  paused = False # UNDO
-               elif menu_index == 2:
-                  # TODO: RESTART case
-                  paused = False
-               elif menu_index == 3:
-                  # RESUME case
-                  paused = False
-               
-               # Pause quick
-               bad_sound.play()
-               time.sleep(0.5)
-         # Did the user close the window?
-         elif event.type == pygame.QUIT:
-            paused = False
-            running = False
+   # Fade the music out
+   menu_music.fadeout(1)
 
-      # Update the highlighted text based on menu_index
-      i = 0
-      for opt in menu_options:
-         if i == menu_index:
-            txt = menu_options_hl[i]
-         else:
-            txt = menu_options[i]
-         # Draw the text to the screen
-         screen.blit(txt, (window.left + ((window.width - txt.get_width()) / 2), window.bottom - ((i + 1) * text_height) - ((i + 1) * (text_height / 2))))
-         # Increment the index
-         i += 1
+   return start
+
+# The pause menu loop
+# Returns whether the game should keep running
+def pause_menu():
+   # Play the menu music
+   menu_music.play(loops=-1)
 
-      # Flip (redraw) the display
-      pygame.display.flip()
+   menu = MenuScene("pause_menu", screen, menu_font, 'PAUSED', ['RESUME', 'RESTART', 'OPTIONS', 'QUIT'], ding_sound, bad_sound)
+
+   running = None
+   while running == None:
+      # Pause quick after a choice, while still handling events
+      choice = menu.run(MENU_CLOSE_DELAY if HEADLESS == False else 0)
+      if choice == 0 or choice == MENU_CANCEL:
+         # RESUME case (or ESC)
+         running = True
+      elif choice == 1:
+         # TODO: RESTART case
+         running = True
+      elif choice == 2:
+         # OPTIONS case, back to the pause menu afterwards
+         running = options_menu()
+         if running == True:
+            running = None
+      else:
+         # QUIT case (or the window was closed)
+         running = False
 
    # Fade the music out
    menu_music.fadeout(1)
@@ -752,228 +893,450 @@ def pause_menu():
    return running
 
 # The options menu loop
-#def options_menu():
-   # TODO Draw game options menu
+# Returns False if the window was closed, otherwise True
+def options_menu():
+   # Labels showing the current state of each toggle
+   def labels():
+      return [
+         'DIRTY RECTS: ' + ('ON' if renderer.enabled == True else 'OFF'),
+         'FRAME TIMING: ' + ('ON' if frame_profiler.overlay == True else 'OFF'),
+         'AUTO QUALITY: ' + ('ON' if governor.enabled == True else 'OFF'),
+         'BACK'
+      ]
+   menu = MenuScene("options_menu", screen, menu_font, 'OPTIONS', labels(), ding_sound, bad_sound)
+
+   while True:
+      choice = menu.run()
+      if choice == 0:
+         renderer.enable(not renderer.enabled)
+      elif choice == 1:
+         frame_profiler.toggle_overlay()
+      elif choice == 2:
+         governor.enable(not governor.enabled)
+      elif choice == MENU_QUIT:
+         return False
+      else:
+         # BACK or ESC
+         return True
+      menu.set_labels(labels())
+
+# Draw the loading screen progress bar (called as each asset finishes decoding)
+def draw_load_progress(done, total, path):
+   screen.fill(COLOR_SKY)
+   bar = pygame.Rect(0, 0, LOAD_BAR_WIDTH, LOAD_BAR_HEIGHT)
+   bar.center = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
+   pygame.draw.rect(screen, COLOR_WHITE, pygame.Rect(bar.left, bar.top, (bar.width * done) // total, bar.height))
+   pygame.draw.rect(screen, COLOR_BLACK, bar, 2)
+   pygame.display.flip()
+   # Keep the window responsive while loading
+   pygame.event.pump()
+
+# Create a new enemy and add it to the sprite groups
+# - x optionally places it across the screen instead of off the right edge
+def spawn_enemy(x=None):
+   new_enemy = enemy_pool.acquire()
+   if x != None:
+      new_enemy.body.centerx = x
+      new_enemy.rect.center = new_enemy.body.center
+   enemies.add(new_enemy)
+   all_sprites.add(new_enemy)
+   if enemy_store != None:
+      enemy_store.add(new_enemy, new_enemy.path.id)
+   return new_enemy
+
+# Create a new cloud and add it to the sprite groups
+def spawn_cloud(x=None):
+   new_cloud = Cloud()
+   if x != None:
+      new_cloud.rect.centerx = x
+   clouds.add(new_cloud)
+   all_sprites.add(new_cloud)
+   return new_cloud
+
+# Create a new orb and add it to the sprite groups
+def spawn_orb():
+   new_orb = Orb()
+   orbs.add(new_orb)
+   all_sprites.add(new_orb)
+   return new_orb
+
+# Get the (image, position) blits of a group of sprites, interpolated between
+# their positions at the start of the last tick and now
+def get_sprite_blits(sprites, prev_positions, alpha):
+   blits = []
+   for entity in sprites:
+      prev = prev_positions.get(entity)
+      if prev == None or alpha == 0:
+         blits.append((entity.surf, entity.rect))
+      else:
+         blits.append((entity.surf, (round(prev[0] + (entity.rect.x - prev[0]) * alpha), round(prev[1] + (entity.rect.y - prev[1]) * alpha))))
+   return blits
+
+# Set up the spawn scheduler for a game from the spawn intervals
+def make_spawner():
+   # Spawn timing has its own randomness, seeded from the gameplay RNG
+   spawner = SpawnScheduler(SIM_TICK_RATE, rng.randrange(2 ** 32))
+   for kind, interval in spawn_intervals:
+      if kind == SPAWN_ENEMY:
+         spawner.add(SpawnRule(kind, interval, SPAWN_JITTER, ENEMY_RAMP_SCORE, ENEMY_MIN_INTERVAL))
+      else:
+         spawner.add(SpawnRule(kind, interval, SPAWN_JITTER))
+   return spawner
 
 # The main game loop
-def game():
+# The simulation runs in fixed ticks of 1/SIM_TICK_RATE seconds, as many per
+# frame as the elapsed time calls for, and frames are drawn as fast as
+# RENDER_FPS allows with sprites interpolated between the last two ticks
+# - max_frames stops the game after that many frames (None runs until quit)
+# - input_fn(tick) returns the pressed key state to use instead of the keyboard
+# - on_frame(frame, player, score) is called at the end of every frame
+# - recorder (InputRecorder) records the keys of every tick
+# - replay (Replay) plays back recorded keys (headless only)
+# Returns a summary of the final game state
+def game(max_frames=None, input_fn=None, on_frame=None, recorder=None, replay=None):
    # Set the game to running
    running = True
 
+   # Number of frames drawn and simulation ticks run
+   frame = 0
+   tick = 0
+
+   # Fixed tick length and the elapsed time not simulated yet (seconds)
+   tick_time = 1.0 / SIM_TICK_RATE
+   accumulator = 0.0
+   last_time = time.perf_counter()
+
+   # Sprite positions at the start of the last tick
+   prev_positions = {}
+
+   # Timed transitions, on simulated time
+   transitions = Transitions()
+
+   # Count this game's draw calls
+   render_queue.reset_stats()
+
+   # Enemy, cloud and orb spawns, on simulated time
+   spawner = make_spawner()
+
+   # Set once the player dies, while the game over sequence plays out
+   game_over = False
+
    # Instantiate the player object
    player = Player()
 
    # Instantiate the score object
    score = Score()
 
+   # Start the HUD over
+   hud.reset()
+
    # Add the player to the all_sprites Group
    all_sprites.add(player)
 
    # Start the music
-   pygame.mixer.music.play(loops=-1)
+   if HEADLESS == False:
+      pygame.mixer.music.play(loops=-1)
    plane_fly_sound.play(loops=-1)
 
    while running:
+      frame += 1
+      frame_start = time.perf_counter()
+      frame_profiler.begin_frame()
+
       # Process all events in the event queue
       for event in pygame.event.get():
          # Did the user hit a key?
          if event.type == KEYDOWN:
-            # Handle ESC keypress
-            if event.key == K_ESCAPE:
+            # Handle ESC keypress (no pausing once the game is over)
+            if event.key == K_ESCAPE and game_over == False:
                #playing = False
                pygame.mixer.music.pause()
                plane_fly_sound.stop()
                running = pause_menu()
+               # The menu drew over the screen
+               renderer.invalidate()
+               # Don't try to catch up on the time spent paused, or count it as frame time
+               last_time = time.perf_counter()
+               frame_start = last_time
                # Only restart the music if we're not quitting
                if running == True:
                   plane_fly_sound.play(loops=-1 == True)
-                  pygame.mixer.music.play(loops=-1)
+                  if HEADLESS == False:
+                     pygame.mixer.music.play(loops=-1)
+            # Handle F3 keypress: toggle the frame timing overlay
+            elif event.key == K_F3:
+               frame_profiler.toggle_overlay()
          # Did the user close the window?
          elif event.type == pygame.QUIT:
             running = False
-         # Add a new enemy?
-         elif event.type == ADDENEMY:
-            # Create the new enemy and add it to the sprite groups
-            new_enemy = Enemy()
-            enemies.add(new_enemy)
-            all_sprites.add(new_enemy)
-         # Add a new cloud?
-         elif event.type == ADDCLOUD:
-            # Create the new cloud and add it to the sprite groups
-            new_cloud = Cloud()
-            clouds.add(new_cloud)
-            all_sprites.add(new_cloud)
-         # Add a new orb?
-         elif event.type == ADDORB:
-            # Create the new orb and add it to the sprite groups
-            new_orb = Orb()
-            orbs.add(new_orb)
-            all_sprites.add(new_orb)
+      frame_profiler.mark("events")
 
       # Check if running again after getting input, in case we need to quit
       if running == True:
-         # Get all the keys currently pressed
-         pressed_keys = pygame.key.get_pressed()
-
-         # Update the player sprite based on user input
-         player.update(pressed_keys)
-
-         # Update shield objects
-         for shield in shields:
-            shield.update(pressed_keys)
-
-         # Update the bullets
-         bullets.update()
-
-         # Update enemy positions and count how many are remaining
-         enemies.update()
-
-         # Update cloud positions
-         clouds.update()
-
-         # Update orb positions
-         orbs.update()
-
-         # Update wave objects
-         for wave in waves:
-            wave.update()
-
-         # Fill the background (sky blue)
-         screen.fill(COLOR_SKY)
-
-         # Draw all sprites to the screen
-         for entity in all_sprites:
-            screen.blit(entity.surf, entity.rect)
-
-         # Draw shield objects to the screen
-         for shield in shields:
-            shield.blit(screen)
-            if shield.is_alive() == False:
-               shields.remove(shield)
-
-         # Draw wave objects to the screen
-         for wave in waves:
-            wave.blit(screen)
-            if wave.is_alive() == False:
-               waves.remove(wave)
-
-         # Check for a collision between the Player and all enemies
-         enemy = pygame.sprite.spritecollideany(player, enemies)
-         if enemy != None:
-            # Check the collision mask for pixel-perfect collision
-            if pygame.sprite.spritecollide(player, enemies, True, pygame.sprite.collide_mask):
-               new_explosion = Explosion(*enemy.get_center())
-               explosions.add(new_explosion)
-               all_sprites.add(new_explosion)
+         # Bank the time since the last frame (headless runs exactly one tick per frame)
+         now = time.perf_counter()
+         if HEADLESS == True:
+            accumulator = tick_time
+         else:
+            accumulator += min(now - last_time, MAX_FRAME_TIME)
+         last_time = now
+
+         # Run as many fixed simulation ticks as the banked time covers
+         # (a sound triggered more than once in those ticks only plays once)
+         audio.begin_frame()
+         while accumulator >= tick_time and running == True:
+            tick += 1
+            accumulator -= tick_time
+
+            # Add the enemies, clouds and orbs due this tick
+            for kind in spawner.pop_due(tick, score.total):
+               if kind == SPAWN_ENEMY:
+                  spawn_enemy()
+               elif kind == SPAWN_CLOUD:
+                  if governor.allow_cloud() == True:
+                     spawn_cloud()
+               elif kind == SPAWN_ORB:
+                  spawn_orb()
+
+            # Positions at the start of the tick, to interpolate from when drawing
+            prev_positions.clear()
+            for entity in all_sprites:
+               prev_positions[entity] = entity.rect.topleft
+            for shield in shields:
+               shield.start_tick()
+            for wave in waves:
+               wave.start_tick()
+
+            # Get all the keys currently pressed
+            if replay != None:
+               pressed_keys = replay.get_keys(tick)
+            elif input_fn != None:
+               pressed_keys = input_fn(tick)
+            else:
+               pressed_keys = pygame.key.get_pressed()
+            if recorder != None:
+               recorder.add_keys(pressed_keys)
+
+            # Update the player sprite based on user input
+            if game_over == False:
+               player.update(pressed_keys)
+
+               # Update shield objects
+               for shield in shields:
+                  shield.update(pressed_keys)
+            frame_profiler.mark("player")
+
+            # Update the bullets
+            bullets.update()
+
+            # Update enemy positions and count how many are remaining
+            if enemy_store != None:
+               enemy_store.update()
+            else:
+               enemies.update()
+
+            # Update cloud positions
+            clouds.update()
+
+            # Update orb positions
+            orbs.update()
+
+            # Update wave objects
+            for wave in waves:
+               wave.update()
+
+            # Remove depleted shields and finished waves
+            for shield in shields:
+               if shield.is_alive() == False:
+                  shields.remove(shield)
+            for wave in waves:
+               if wave.is_alive() == False:
+                  waves.remove(wave)
+            frame_profiler.mark("updates")
+
+            # Bucket enemies and orbs into the broadphase grids, so the mask checks
+            # below only run against sprites that share a grid cell
+            enemy_grid.build(enemies)
+            orb_grid.build(orbs)
+            frame_profiler.mark("broadphase")
+
+            # Check for a collision between the Player and all enemies
+            # (using the collision mask for pixel-perfect collision)
+            hits = []
+            if game_over == False:
+               hits = enemy_grid.spritecollide(player, True, pygame.sprite.collide_mask)
+            if hits:
+               enemy = hits[0]
+               explosions.add(*enemy.get_center())
                # Apply damage
                player.dec_health(enemy.get_dmg())
                player.dec_power(1)
                boom_sound.play()
+            frame_profiler.mark("collide_player")
 
-         # Check for a collision between all bullets and enemies
-         for bullet in bullets:
-            enemy = pygame.sprite.spritecollideany(bullet, enemies)
-            if enemy != None:
+            # Check for a collision between all bullets and enemies
+            # (once the player is dead the score is final, kills no longer count)
+            for bullet in bullets:
                # Check the collision mask for pixel-perfect collision
-               hits = pygame.sprite.spritecollide(bullet, enemies, True, pygame.sprite.collide_mask)
-               if hits != None:
-                  for i in hits:
-                     hit = hits.pop()
+               hits = enemy_grid.spritecollide(bullet, True, pygame.sprite.collide_mask)
+               for i in hits:
+                  hit = hits.pop()
+                  if game_over == False:
                      score.add(hit.get_score())
-                     new_explosion = Explosion(*bullet.get_center())
-                     explosions.add(new_explosion)
-                     all_sprites.add(new_explosion)
-                     hit.kill()
-                     bullet.kill()
-
-         # Check for a collision between Wave objects and enemies
-         for wave in waves:
-            play_sound = True
-            wave_center_x, wave_center_y = wave.get_center()
-            for enemy in enemies:
-               enemy_center_x, enemy_center_y = enemy.rect.center
-               dist_y = enemy_center_y - wave_center_y
-               dist_x = enemy_center_x - wave_center_x
-               dist = math.sqrt((dist_x * dist_x) + (dist_y * dist_y))
-
-               # Kill the enemy if they are in the circle
-               if dist <= wave.get_radius():
-                  new_explosion = Explosion(*enemy.get_center())
-                  explosions.add(new_explosion)
-                  all_sprites.add(new_explosion)
-                  score.add(enemy.get_score())
-                  enemy.kill()
-                  if play_sound == True:
+                  explosions.add(*bullet.get_center())
+                  hit.kill()
+                  bullet.kill()
+            frame_profiler.mark("collide_bullets")
+
+            # Check for collisions between Wave/Shield objects and enemies
+            # Enemy centers are packed once and tested against every circle in one batch
+            if len(waves) > 0 or len(shields) > 0:
+               enemy_list = enemies.sprites()
+               circles = [(wave.get_center(), wave.get_radius()) for wave in waves]
+               circles += [(shield.get_center(), shield.get_radius()) for shield in shields]
+               kills = radius_kills([enemy.rect.center for enemy in enemy_list], circles)
+
+               # Kill the enemies inside each wave
+               for wave, wave_kills in zip(waves, kills[:len(waves)]):
+                  for i in wave_kills:
+                     enemy = enemy_list[i]
+                     explosions.add(*enemy.get_center())
+                     if game_over == False:
+                        score.add(enemy.get_score())
+                     enemy.kill()
+                  # Only play one sound per wave
+                  if len(wave_kills) > 0:
                      boom_sound.play()
-                     play_sound = False
 
-         # Check for a collision between Shield objects and enemies
-         for shield in shields:
-            play_sound = True
-            shield_center_x, shield_center_y = shield.get_center()
-            for enemy in enemies:
-               enemy_center_x, enemy_center_y = enemy.rect.center
-               dist_y = enemy_center_y - shield_center_y
-               dist_x = enemy_center_x - shield_center_x
-               dist = math.sqrt((dist_x * dist_x) + (dist_y * dist_y))
-
-               # Kill the enemy if they are in the circle
-               if dist <= shield.get_radius():
-                  new_explosion = Explosion(*enemy.get_center())
-                  explosions.add(new_explosion)
-                  all_sprites.add(new_explosion)
-                  score.add(enemy.get_score())
-                  enemy.kill()
-                  shield.hit()
-                  if play_sound == True:
+               # Kill the enemies inside each shield, each kill costs the shield a hit
+               for shield, shield_kills in zip(shields, kills[len(waves):]):
+                  for i in shield_kills:
+                     enemy = enemy_list[i]
+                     explosions.add(*enemy.get_center())
+                     if game_over == False:
+                        score.add(enemy.get_score())
+                     enemy.kill()
+                     shield.hit()
+                  # Only play one sound per shield
+                  if len(shield_kills) > 0:
                      boom_sound.play()
-                     play_sound = False
-
-         # Update explosions
-         explosions.update()
-
-         # Check for a collision between the Player and all orbs
-         orb = pygame.sprite.spritecollideany(player, orbs)
-         if orb != None:
-            # Check the collision mask for pixel-perfect collision
-            if pygame.sprite.spritecollide(player, orbs, True, pygame.sprite.collide_mask):
+            frame_profiler.mark("collide_areas")
+
+            # Advance every explosion (short explosions skip every other image)
+            if governor.is_cut(QUALITY_SHORT_EXPLOSIONS) == True:
+               explosions.set_frame_step(2)
+            else:
+               explosions.set_frame_step(1)
+            explosions.update()
+            frame_profiler.mark("explosions")
+
+            # Check for a collision between the Player and all orbs
+            # (using the collision mask for pixel-perfect collision)
+            hits = []
+            if game_over == False:
+               hits = orb_grid.spritecollide(player, True, pygame.sprite.collide_mask)
+            if hits:
                # If so, apply the power-up and play a sound
+               orb = hits[0]
                player.collect_orb(orb.get_type())
                powerup_sound.play()
                score.add(orb.get_score())
+            frame_profiler.mark("collide_orbs")
+
+            # Check for player death
+            if game_over == False and player.get_health() == PLAYER_HEALTH_MIN:
+               # TODO Implement a death animation
+               # Remove the player
+               player.kill()
+
+               # Let the final explosions play out, then play the game over
+               # sound and stop the game loop
+               game_over = True
+               transitions.schedule(GAME_OVER_SOUND, GAME_OVER_SOUND_DELAY)
+               transitions.schedule(GAME_OVER_END, GAME_OVER_END_DELAY)
+
+            # Run the transitions that came due this tick
+            transitions.advance(tick_time * 1000)
+            for name in transitions.pop_due():
+               if name == GAME_OVER_SOUND:
+                  gamover_sound.play()
+               elif name == GAME_OVER_END:
+                  running = False
 
-         # Update the score text
-         score.update()
+         audio.end_frame()
 
-         # Draw the score to the screen
-         score.blit(screen)
+         # How far the simulation is between the last tick and the next one
+         alpha = accumulator / tick_time
 
-         # Draw the player's health bar
-         player.draw_health_bar(screen)
+         # Fill the background (sky blue)
+         # Wave rings cover the whole screen, so they need a full redraw
+         renderer.begin_frame(screen, len(waves) > 0)
+
+         # Queue the sprites on their layers, interpolated between their last two
+         # tick positions (sprites spawned since the last tick have no previous one)
+         for layer, sprites in ((LAYER_CLOUDS, clouds), (LAYER_ORBS, orbs), (LAYER_ENEMIES, enemies), (LAYER_BULLETS, bullets)):
+            if render_queue.is_enabled(layer) == True:
+               render_queue.submit_many(layer, get_sprite_blits(sprites, prev_positions, alpha))
+         if player.alive() == True:
+            render_queue.submit_many(LAYER_PLAYER, get_sprite_blits([player], prev_positions, alpha))
+
+         # Queue the explosions, shields and waves on top
+         render_queue.submit_many(LAYER_EFFECTS, explosions.get_blits())
+         for shield in shields:
+            shield.interpolate(alpha)
+            render_queue.draw(LAYER_EFFECTS, shield.blit)
+         for wave in waves:
+            wave.interpolate(alpha)
+            render_queue.draw(LAYER_EFFECTS, wave.blit)
+         frame_profiler.mark("queue")
 
-         # Check for player death
-         if player.get_health() == PLAYER_HEALTH_MIN:
-            # TODO Implement a death animation, or at least allow the final explosions to complete
-            # Remove the player
-            player.kill()
+         # Re-render the HUD layers whose values changed
+         hud.update(score, player)
 
-            # Stop the game loop
-            running = False
+         # Queue the score, the player's health bar and power-ups
+         render_queue.submit_many(LAYER_HUD, hud.get_blits())
+         frame_profiler.sample("hud_renders_per_s", hud.get_renders_per_second)
+         frame_profiler.mark("hud")
+
+         # Draw the layers back to front, one blits() call per layer
+         render_queue.flush(screen, renderer)
+         frame_profiler.mark("draw")
+
+         # Draw the frame timing overlay
+         renderer.add(frame_profiler.draw(screen))
+         frame_profiler.mark("overlay")
 
-         # Flip (redraw) the display
-         pygame.display.flip()
+         # Flip (redraw) the display, or just the parts that changed
+         renderer.present()
+         frame_profiler.mark("flip")
+
+      # Let the caller inspect or script the game state
+      if on_frame != None:
+         on_frame(frame, player, score)
+
+      # Stop after a fixed number of frames, or at the end of a replay
+      if max_frames != None and frame >= max_frames:
+         running = False
+      if replay != None and tick >= replay.ticks:
+         running = False
 
       # Game is no longer running
       if running == False:
-         # Pause before closing
-         time.sleep(1)
-         gamover_sound.play()
-         time.sleep(3)
          pygame.mixer.music.stop()
          plane_fly_sound.stop()
 
-      # Ensure game maintains framerate of 30 fps
-      clock.tick(GAME_FPS_30)
+      # Adjust the quality to the time this frame took, then cap the render
+      # frame rate (headless runs flat out)
+      governor.add_frame((time.perf_counter() - frame_start) * 1000, frame)
+      if HEADLESS == False:
+         clock.tick(RENDER_FPS)
+      frame_profiler.mark("tick")
+      frame_profiler.end_frame()
+
+   frame_profiler.add_counters("spawns", spawner.get_stats())
+   frame_profiler.add_counters("render_queue", render_queue.get_counters())
+   frame_profiler.add_counters("hud", hud.get_counters())
+   return {"frames": frame, "ticks": tick, "score": score.total, "health": player.get_health()}
 
 # Clean up pygame resources and quit the game
 def cleanup():
@@ -988,71 +1351,266 @@ def cleanup():
 # Core Logic
 #------------------------------
 
-# Set up mixer for audio
-pygame.mixer.init()
-
-# Initialize pygame
-pygame.init()
-
-# Setup the clock for deterministic framerate
-clock = pygame.time.Clock()
-
-# Create the screen object
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-
-# Create a custom event for adding new enemies
-ADDENEMY = pygame.USEREVENT + 1
-pygame.time.set_timer(ADDENEMY, 250)
-
-# Create a custom event for adding a new cloud
-ADDCLOUD = pygame.USEREVENT + 2
-pygame.time.set_timer(ADDCLOUD, 2000)
-
-# Create a custom event for adding orbs
-ADDORB = pygame.USEREVENT + 3
-pygame.time.set_timer(ADDORB, 15000)
-
-# Create Groups to hold enemy sprites and all sprited
-# - enemies is used for collision detection and postition updates
-# - orbs is used for collision detection and position updates
-# - clouds is used for position updates
-# - all_sprites is used for rendering
-enemies = pygame.sprite.Group()
-orbs = pygame.sprite.Group()
-clouds = pygame.sprite.Group()
-bullets = pygame.sprite.Group()
-explosions = pygame.sprite.Group()
-all_sprites = pygame.sprite.Group()
-
-# Wave object group
-waves = []
-
-# Shield object group
-shields = []
-
-# Load and play background music
-pygame.mixer.music.load(MUSIC_SND)
-
-# Load and play plane flying sound
-plane_fly_sound = pygame.mixer.Sound(PLANE_SND)
-
-# Load all other sound files
-boom_sound = pygame.mixer.Sound(BOOM_SND)
-ding_sound = pygame.mixer.Sound(DING_SND)
-powerup_sound = pygame.mixer.Sound(POWERUP_SND)
-gamover_sound = pygame.mixer.Sound(GAMOVR_SND)
-bad_sound = pygame.mixer.Sound(BAD_SND)
-pew_sound = pygame.mixer.Sound(PEW_SND)
-menu_music = pygame.mixer.Sound(MENU_SND)
-
-# TODO: Load all game sounds
-#init_sounds()
-
-# Play the Intro
-#intro()
+# Set up pygame, the display, the assets and the sprite groups
+# - headless uses the SDL dummy video/audio drivers, so no window or sound
+#   card is needed, and doesn't pace the frame rate
+# - seed makes all gameplay randomness reproducible (None for a random seed)
+def init(headless=False, seed=None):
+   global HEADLESS, clock, screen, renderer, render_queue, governor, sprite_atlas
+   global bullet_pool, enemy_pool, enemy_store, enemy_grid, orb_grid
+   global enemies, orbs, clouds, bullets, explosions, all_sprites, waves, shields
+   global menu_font, hud, startup_stats, asset_pack, rotation_cache, flight_paths
+   global audio, plane_fly_sound, boom_sound, ding_sound, powerup_sound, gamover_sound, bad_sound, pew_sound, menu_music
+
+   # Cold-start timing
+   start_time = time.perf_counter()
+
+   HEADLESS = headless
+   if HEADLESS == True:
+      os.environ["SDL_VIDEODRIVER"] = "dummy"
+      os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+   # Seed the gameplay and scenery random number generators
+   rng.seed(seed)
+   scenery_rng.seed(seed)
+
+   # Set up mixer for audio
+   pygame.mixer.init()
+
+   # Initialize pygame
+   pygame.init()
+
+   # Setup the clock for deterministic framerate
+   clock = pygame.time.Clock()
+
+   # Create the screen object
+   screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+   # Full-screen or dirty-rect rendering
+   renderer = DirtyRenderer(COLOR_SKY, USE_DIRTY_RECTS)
+
+   # Layered drawing, back to front
+   render_queue = RenderQueue(RENDER_LAYERS)
+
+   # Adaptive quality against the frame budget of the frame rate cap (headless
+   # runs aren't paced, so there's no budget to keep to), logging every step
+   budget_ms = None
+   if RENDER_FPS > 0:
+      budget_ms = 1000.0 / RENDER_FPS
+   governor = QualityGovernor(budget_ms, USE_QUALITY_GOVERNOR == True and HEADLESS == False, print)
+
+   # Scale the timing overlay to the same budget
+   frame_profiler.set_budget(budget_ms)
+
+   # Work out what to decode: the atlas sheets, the images the atlas doesn't
+   # provide and every sound
+   manifest = []
+   atlas_manifest = None
+   atlas_colorkeys = {}
+   if os.path.exists(ATLAS_MANIFEST):
+      atlas_manifest = read_manifest(ATLAS_MANIFEST)
+      atlas_colorkeys = get_frame_colorkeys(atlas_manifest)
+      manifest += [(ASSET_IMAGE, sheet_info["image"], None) for sheet_info in atlas_manifest["sheets"]]
+   for kind, path, option in ASSET_MANIFEST:
+      if kind == ASSET_IMAGE and path in atlas_colorkeys and atlas_colorkeys[path] == option:
+         continue
+      manifest.append((kind, path, option))
+
+   # Take what the baked asset pack has straight from its buffers (when it's
+   # missing or out of date for a file, that file is decoded instead), and
+   # decode the rest in parallel, showing the progress
+   asset_pack = AssetPack()
+   loader = AssetLoader()
+   if asset_pack.open(ASSET_PACK) == True:
+      loader.load(manifest, draw_load_progress, asset_pack)
+   else:
+      loader.load(manifest, draw_load_progress)
+
+   # Cut the frames out of the sprite sheets
+   sprite_atlas = Atlas()
+   if atlas_manifest != None:
+      sprite_atlas.load(ATLAS_MANIFEST, loader.images)
+      frame_cache.attach_atlas(sprite_atlas)
+
+   # Convert every sprite frame once, now that the display format is known
+   frame_cache.attach_decoded(loader.images)
+   for kind, path, option in ASSET_MANIFEST:
+      if kind == ASSET_IMAGE:
+         frame_cache.preload([path], option)
+   frame_cache.attach_decoded(None)
+
+   # Use the masks baked into the asset pack, then build one collision mask
+   # per distinct frame of the colliding sprites for anything still missing
+   for kind, path, option in ASSET_MANIFEST:
+      if kind == ASSET_IMAGE:
+         mask = asset_pack.get_mask(path, option)
+         if mask != None:
+            mask_registry.add(path, option, mask)
+   mask_registry.preload(plane_animation_imgs, COLOR_WHITE)
+   mask_registry.preload(bullet_animation_imgs, COLOR_BLACK)
+   mask_registry.preload(enemy_imgs, COLOR_WHITE)
+   mask_registry.preload(orb_imgs, COLOR_BLACK)
+
+   # Pre-render the enemies at every heading they can turn to
+   rotation_cache = RotationCache(frame_cache, mask_registry)
+   rotation_cache.build(enemy_imgs, COLOR_WHITE)
+   frame_profiler.add_counters("rotation_cache", rotation_cache.get_stats())
+
+   # Compile the flight paths into per-column step tables
+   flight_paths = FlightPaths()
+   flight_paths.load(FLIGHT_PATHS, -PATH_MARGIN, SCREEN_WIDTH + PATH_MARGIN)
+
+   # Pre-size the sprite pools (needs the frame cache and the flight paths)
+   bullet_pool = SpritePool(lambda: Bullet(0, 0, flight_paths.get(PATH_LINEAR)), BULLET_POOL_SIZE)
+   enemy_pool = SpritePool(Enemy, ENEMY_POOL_SIZE)
+
+   # Optional array-backed enemy movement (needs NumPy)
+   enemy_store = None
+   if USE_ENEMY_STORE == True and numpy != None:
+      enemy_store = EnemyStore(flight_paths)
+
+   # Broadphase grids for collision detection, rebuilt every frame
+   enemy_grid = SpatialHash()
+   orb_grid = SpatialHash()
+
+   # Create Groups to hold enemy sprites and all sprited
+   # - enemies is used for collision detection and postition updates
+   # - orbs is used for collision detection and position updates
+   # - clouds is used for position updates
+   # - all_sprites is used for interpolation and clean-up (each group is drawn on its own render layer)
+   enemies = pygame.sprite.Group()
+   orbs = pygame.sprite.Group()
+   clouds = pygame.sprite.Group()
+   bullets = pygame.sprite.Group()
+   all_sprites = pygame.sprite.Group()
+
+   # Explosions are batched particles rather than sprites
+   explosions = ExplosionSystem([frame_cache.get(path, COLOR_WHITE) for path in explosion_animation_imgs], EXPLOSION_FRAMES_PER_IMG)
+
+   # Wave object group
+   waves = []
+
+   # Shield object group
+   shields = []
+
+   # Load and play background music
+   if HEADLESS == False:
+      pygame.mixer.music.load(MUSIC_SND)
+
+   # Decode every sound once, each playing on its category's reserved channels
+   audio = AudioManager()
+
+   # Load and play plane flying sound
+   plane_fly_sound = audio.load("plane", PLANE_SND, AUDIO_MUSIC, sound=loader.sounds.get(PLANE_SND))
+
+   # Load all other sound files
+   boom_sound = audio.load("boom", BOOM_SND, AUDIO_EXPLOSIONS, sound=loader.sounds.get(BOOM_SND))
+   ding_sound = audio.load("ding", DING_SND, AUDIO_UI, sound=loader.sounds.get(DING_SND))
+   powerup_sound = audio.load("powerup", POWERUP_SND, AUDIO_UI, 1, sound=loader.sounds.get(POWERUP_SND))
+   gamover_sound = audio.load("game_over", GAMOVR_SND, AUDIO_UI, 2, sound=loader.sounds.get(GAMOVR_SND))
+   bad_sound = audio.load("bad", BAD_SND, AUDIO_UI, sound=loader.sounds.get(BAD_SND))
+   pew_sound = audio.load("pew", PEW_SND, AUDIO_WEAPONS, 0, PEW_MIN_INTERVAL, sound=loader.sounds.get(PEW_SND))
+   menu_music = audio.load("menu_music", MENU_SND, AUDIO_MUSIC, 1, sound=loader.sounds.get(MENU_SND))
+
+   # Fonts are looked up once here rather than when a menu or overlay opens
+   menu_font = pygame.font.SysFont('Arial', 25)
+   hud = Hud()
+   frame_profiler.load_font()
+
+   # Report the cold-start time
+   startup_stats = {
+      "init_ms": (time.perf_counter() - start_time) * 1000,
+      "decode_ms": loader.decode_ms,
+      "assets": len(loader.images) + len(loader.sounds),
+      "from_pack": loader.from_pack,
+      "workers": loader.workers
+   }
+   frame_profiler.add_counters("startup", startup_stats)
+
+# Parse the command line, then run the game
+def main():
+   global RENDER_FPS
+
+   parser = argparse.ArgumentParser(description="Dodge and shoot down the incoming missiles.")
+   parser.add_argument("--headless", action="store_true", help="run without a window or sound (SDL dummy drivers)")
+   parser.add_argument("--seed", type=int, default=None, help="seed for all gameplay randomness")
+   parser.add_argument("--frames", type=int, default=None, help="stop after this many frames")
+   parser.add_argument("--fps", type=int, default=RENDER_FPS, help="render frame rate cap, 0 for uncapped (the simulation always runs at {} ticks/s)".format(SIM_TICK_RATE))
+   parser.add_argument("--dirty", action="store_true", help="only redraw the parts of the screen that changed")
+   parser.add_argument("--record", default=None, metavar="FILE", help="record the session's input to FILE for replaying")
+   parser.add_argument("--replay", default=None, metavar="FILE", help="play back a recorded session headless and check it ends the same way")
+   parser.add_argument("--profile", default=None, metavar="FILE", help="time each frame phase and write the stats to FILE (.json or .csv) on exit")
+   parser.add_argument("--hide-layer", action="append", default=[], choices=RENDER_LAYERS, metavar="LAYER", help="don't draw a render layer (one of {}), can be repeated".format(", ".join(RENDER_LAYERS)))
+   args = parser.parse_args()
+
+   # Per-phase timing (the overlay can also be toggled in game with F3)
+   if args.profile != None:
+      frame_profiler.enable()
+
+   RENDER_FPS = args.fps
+
+   # A replay runs headless with the recorded seed, a recording needs a known seed
+   replay = None
+   recorder = None
+   headless = args.headless
+   seed = args.seed
+   if args.replay != None:
+      replay = Replay(args.replay)
+      headless = True
+      seed = replay.seed
+   elif args.record != None:
+      if seed == None:
+         seed = random.randrange(2 ** 32)
+      recorder = InputRecorder(seed)
+
+   init(headless=headless, seed=seed)
+   print("Started in {:.0f} ms ({} assets loaded in {:.0f} ms, {} from the asset pack, the rest on {} threads)".format(startup_stats["init_ms"], startup_stats["assets"], startup_stats["decode_ms"], startup_stats["from_pack"], startup_stats["workers"]))
+   if args.dirty == True:
+      renderer.enable()
+   for layer in args.hide_layer:
+      render_queue.enable_layer(layer, False)
+
+   # Play the Intro
+   #intro()
+
+   # Show the start menu (headless runs go straight to the game)
+   if HEADLESS == False and start_menu() == False:
+      cleanup()
+      return
+
+   # Run the Game loop
+   start_time = time.perf_counter()
+   result = game(max_frames=args.frames, recorder=recorder, replay=replay)
+   elapsed = time.perf_counter() - start_time
+   if HEADLESS == True:
+      print(result)
+   if args.profile != None:
+      # Frame and mask cache totals for the session (misses and disk loads
+      # should all come from init, before the first frame)
+      frame_profiler.add_counters("frame_cache", frame_cache.get_stats())
+      frame_profiler.add_counters("mask_registry", mask_registry.get_stats())
+      # Pool high-water marks, for sizing the pools
+      frame_profiler.add_counters("bullet_pool", bullet_pool.get_stats())
+      frame_profiler.add_counters("enemy_pool", enemy_pool.get_stats())
+      frame_profiler.dump(args.profile)
+
+   # Save the recording, or check the replay ended the same way as the recording
+   replay_ok = True
+   if recorder != None:
+      size = recorder.save(args.record, result["score"], result["health"])
+      print("Recorded {} ticks to {} ({} bytes)".format(result["ticks"], args.record, size))
+   if replay != None:
+      speed = (result["ticks"] / SIM_TICK_RATE) / max(elapsed, 1e-9)
+      replay_ok = replay.matches(result["score"], result["health"])
+      if replay_ok == True:
+         print("Replay OK: score {} health {} after {} ticks ({:.1f}x real time)".format(result["score"], result["health"], result["ticks"], speed))
+      else:
+         print("Replay MISMATCH: expected score {} health {}, got score {} health {}".format(replay.score, replay.health, result["score"], result["health"]))
 
-# Run the Game loop
-game()
+   # Cleanup and exit the game
+   cleanup()
+   if replay_ok == False:
+      sys.exit(1)
 
-# Cleanup and exit the game
-cleanup()
\ No newline at end of file
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,181 @@
+# Event-driven menu scene.
+#
+# A menu blocks on pygame.event.wait() instead of polling the event queue
+# in a tight loop, and only redraws its window (and updates that part of
+# the display) when the highlighted option or a label changes. While a
+# menu is open and idle the process sleeps inside SDL, so it costs close
+# to no CPU.
+#
+# Every time a menu closes, the time it was open, the CPU time it used and
+# how often it woke up and updated the display are added to the frame
+# profiler's counters under the menu's name.
+
+#------------------------------
+# Imports
+#------------------------------
+import time    # Wall-clock and CPU time
+import pygame  # Import the pygame library
+
+from transitions import Transitions        # Delayed close
+from frame_profiler import frame_profiler  # Idle counters
+
+from pygame.locals import (
+   K_UP,       # UP Key
+   K_DOWN,     # DOWN Key
+   K_ESCAPE,   # ESC Key
+   K_RETURN,   # RETURN Key
+   K_KP_ENTER, # ENTER Key
+   KEYDOWN,    # Keypress Event
+   QUIT        # Quit Event
+)
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Longest time (ms) to block waiting for an event
+MENU_WAIT_TIMEOUT = 1000
+
+# Values returned by run() when no option was chosen
+MENU_CANCEL = -1  # ESC
+MENU_QUIT = -2    # Window closed
+
+# Transition name for the delayed close after a choice
+MENU_CLOSE = "menu_close"
+
+# Menu colors
+MENU_BORDER = (  0,   0,   0)
+MENU_WINDOW = (128, 128, 128)
+MENU_TITLE  = (  0,   0,   0)
+MENU_TEXT   = (255, 255, 255)
+MENU_HL     = (255, 255,   0)
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Menu Scene Class
+# - labels are the option names, listed top to bottom
+# - move_sound/select_sound play when the highlight moves or an option is chosen
+class MenuScene(object):
+   def __init__(self, name, surf, font, title, labels, move_sound=None, select_sound=None):
+      self.name = name
+      self.surf = surf
+      self.font = font
+      self.move_sound = move_sound
+      self.select_sound = select_sound
+      self.menu_index = 0
+
+      # Window centered on the surface, a quarter of its width and a third of its height
+      border_width = surf.get_width() / 4
+      border_height = surf.get_height() / 3
+      self.border = pygame.Rect(0, 0, border_width, border_height)
+      self.border.center = surf.get_rect().center
+      self.window = pygame.Rect(0, 0, border_width - 4, border_height - 4)
+      self.window.center = surf.get_rect().center
+
+      self.title_text = font.render(title, True, MENU_TITLE)
+      self.set_labels(labels)
+
+      # Counters for the current run
+      self.wakeups = 0
+      self.flips = 0
+
+   # Change the option names (e.g. a toggle's state), redrawn on the next repaint
+   def set_labels(self, labels):
+      self.labels = list(labels)
+      self.texts = [self.font.render(label, True, MENU_TEXT) for label in self.labels]
+      self.texts_hl = [self.font.render(label, True, MENU_HL) for label in self.labels]
+      self.dirty = True
+
+   # Draw the whole menu window and push it to the display
+   def repaint(self):
+      pygame.draw.rect(self.surf, MENU_BORDER, self.border, border_radius=8)
+      pygame.draw.rect(self.surf, MENU_WINDOW, self.window, border_radius=8)
+      text_height = self.title_text.get_height()
+      self.surf.blit(self.title_text, (self.window.left + ((self.window.width - self.title_text.get_width()) / 2), self.window.top + (text_height / 2)))
+
+      # Options are laid out from the bottom of the window up
+      count = len(self.texts)
+      for i in range(count):
+         if i == self.menu_index:
+            txt = self.texts_hl[i]
+         else:
+            txt = self.texts[i]
+         row = count - i
+         self.surf.blit(txt, (self.window.left + ((self.window.width - txt.get_width()) / 2), self.window.bottom - (row * text_height) - (row * (text_height / 2))))
+
+      pygame.display.update(self.border)
+      self.flips += 1
+      self.dirty = False
+
+   # Run the menu until an option is chosen, ESC is pressed or the window is closed
+   # - close_delay keeps the menu up (still handling events) for that many ms after a choice
+   # Returns the chosen option index, MENU_CANCEL or MENU_QUIT
+   def run(self, close_delay=0):
+      start_time = time.perf_counter()
+      start_cpu = time.process_time()
+      self.wakeups = 0
+      self.flips = 0
+      self.dirty = True
+
+      timers = Transitions(pygame.time.get_ticks())
+      choice = None
+      result = None
+      while result == None:
+         if self.dirty == True:
+            self.repaint()
+
+         # Sleep until something happens, or the pending close is due
+         timers.set_time(pygame.time.get_ticks())
+         timeout = MENU_WAIT_TIMEOUT
+         if timers.time_until_next() != None:
+            timeout = min(timeout, timers.time_until_next())
+         if timeout > 0:
+            event = pygame.event.wait(timeout)
+         else:
+            # A zero timeout would block forever
+            event = pygame.event.poll()
+         self.wakeups += 1
+
+         # Handle everything that queued up while asleep
+         events = [event] + pygame.event.get()
+         for event in events:
+            if event.type == QUIT:
+               result = MENU_QUIT
+               break
+            # Keys are ignored once an option was chosen
+            if event.type != KEYDOWN or choice != None:
+               continue
+            if event.key == K_ESCAPE:
+               result = MENU_CANCEL
+               break
+            elif event.key == K_UP:
+               self.menu_index = (self.menu_index - 1) % len(self.labels)
+               self.dirty = True
+               if self.move_sound != None:
+                  self.move_sound.play()
+            elif event.key == K_DOWN:
+               self.menu_index = (self.menu_index + 1) % len(self.labels)
+               self.dirty = True
+               if self.move_sound != None:
+                  self.move_sound.play()
+            elif event.key == K_RETURN or event.key == K_KP_ENTER:
+               if self.select_sound != None:
+                  self.select_sound.play()
+               choice = self.menu_index
+               timers.schedule(MENU_CLOSE, close_delay)
+
+         # Close once the pause after a choice is over
+         timers.set_time(pygame.time.get_ticks())
+         if result == None and MENU_CLOSE in timers.pop_due():
+            result = choice
+
+      frame_profiler.add_counters(self.name, {
+         "runs": 1,
+         "open_s": time.perf_counter() - start_time,
+         "cpu_s": time.process_time() - start_cpu,
+         "wakeups": self.wakeups,
+         "flips": self.flips
+      })
+      return result
@@ -0,0 +1,92 @@
+# Batched explosion effects.
+#
+# Explosions are particles rather than sprites: every live explosion is
+# just an entry in a few parallel lists (top left position and the tick it
+# started on), with no surface, rect, update() or group membership of its
+# own. The animation frame of each one follows from its age, so advancing
+# all of them is a single tick counter increment, and since they all last
+# the same number of ticks the finished ones are always at the front of the
+# lists and are dropped in one slice. Drawing is one (image, position)
+# sequence over the shared animation frames, for a single Surface.blits().
+#
+# A mass kill (e.g. a red orb Wave) adds a few list entries per explosion,
+# so it costs about the same as any other frame.
+
+#------------------------------
+# Imports
+#------------------------------
+import bisect  # Finding the finished explosions
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Explosion System Class
+class ExplosionSystem(object):
+   def __init__(self, frames, ticks_per_frame):
+      # Shared animation frames, each shown for ticks_per_frame ticks
+      self.frames = frames
+      self.ticks_per_frame = ticks_per_frame
+      # Frames to advance at a time (2 plays every other frame)
+      self.frame_step = 1
+      self.tick = 0
+      # Live explosions, oldest first
+      self.x = []
+      self.y = []
+      self.start = []
+      # Counters
+      self.spawned = 0
+      self.batches = 0
+
+   # Start an explosion centered on a point
+   def add(self, x, y):
+      rect = self.frames[0].get_rect(center = (x, y))
+      self.x.append(rect.x)
+      self.y.append(rect.y)
+      self.start.append(self.tick)
+      self.spawned += 1
+
+   # Play every other frame (step 2) or all of them (step 1)
+   def set_frame_step(self, step):
+      if step != self.frame_step:
+         self.frame_step = step
+         self.expire()
+
+   # Advance every explosion one tick and drop the ones that have finished
+   def update(self):
+      self.tick += 1
+      self.expire()
+
+   # Drop the explosions past their last frame
+   def expire(self):
+      # An explosion aged a ticks shows frame (a // ticks_per_frame) * frame_step
+      last_start = self.tick + 1 - ((len(self.frames) - 1) // self.frame_step + 1) * self.ticks_per_frame
+      done = bisect.bisect_left(self.start, last_start)
+      if done > 0:
+         del self.x[:done]
+         del self.y[:done]
+         del self.start[:done]
+
+   # Get every explosion as one (image, position) sequence, to draw in one blits() call
+   def get_blits(self):
+      if len(self.start) == 0:
+         return []
+      frames = self.frames
+      per_frame = self.ticks_per_frame
+      step = self.frame_step
+      now = self.tick
+      self.batches += 1
+      return [(frames[((now - start) // per_frame) * step], (x, y)) for x, y, start in zip(self.x, self.y, self.start)]
+
+   # Drop every explosion
+   def clear(self):
+      del self.x[:]
+      del self.y[:]
+      del self.start[:]
+
+   def __len__(self):
+      return len(self.start)
+
+   # Get the system counters
+   def get_stats(self):
+      return {"live": len(self.start), "spawned": self.spawned, "batches": self.batches}
@@ -0,0 +1,133 @@
+# Adaptive quality governor.
+#
+# Watches a rolling average of the time each frame spends working (not
+# waiting in clock.tick) against the frame budget of the render frame rate
+# cap. When frames run over budget it steps the quality down one level,
+# cutting non-essential work in a fixed order; once there's plenty of
+# headroom again it steps back up one level at a time.
+#
+# Hysteresis keeps it from flapping between levels: stepping down needs a
+# full window of frames averaging over budget, stepping up needs a longer
+# run of frames averaging well under it, and after every step the window
+# starts over. Every step is logged with the averages behind it, so the
+# thresholds can be tuned.
+#
+# Nothing the governor cuts affects the simulation, so recordings replay
+# the same whatever quality they were recorded at.
+
+#------------------------------
+# Imports
+#------------------------------
+import collections  # Rolling frame time window
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Quality levels, from full quality down, each also keeping the cuts before it
+QUALITY_FULL = 0
+QUALITY_FEWER_CLOUDS = 1      # Only every other cloud spawns
+QUALITY_SHORT_EXPLOSIONS = 2  # Explosions skip every other animation frame
+QUALITY_NO_PEW = 3            # The gun is silent
+QUALITY_SIMPLE_WAVES = 4      # Wave rings are drawn thin
+
+QUALITY_NAMES = ["full", "fewer clouds", "short explosions", "no pew", "simple waves"]
+
+# Frames in the rolling average
+QUALITY_WINDOW = 30
+
+# Step down when the average is over this share of the budget
+QUALITY_DOWN_RATIO = 1.0
+
+# Step up when the average has stayed under this share of the budget for
+# QUALITY_UP_FRAMES frames in a row
+QUALITY_UP_RATIO = 0.6
+QUALITY_UP_FRAMES = 120
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Quality Governor Class
+class QualityGovernor(object):
+   def __init__(self, budget_ms, enabled=True, log=None):
+      # Frame budget (ms), None for no budget (uncapped frame rate)
+      self.budget_ms = budget_ms
+      self.enabled = enabled
+      # Called with a message on every step
+      self.log = log
+      self.level = QUALITY_FULL
+      self.window = collections.deque(maxlen=QUALITY_WINDOW)
+      self.window_sum = 0.0
+      self.under_frames = 0
+      # Clouds spawned and skipped at the current level
+      self.cloud_cnt = 0
+      # Steps taken, as (frame, old level, new level, average ms)
+      self.steps = []
+
+   # Turn the governor on or off (off goes back to full quality)
+   def enable(self, enabled=True):
+      self.enabled = enabled
+      if enabled == False and self.level != QUALITY_FULL:
+         self.set_level(QUALITY_FULL, None, self.get_average())
+      self.reset()
+
+   # Forget the frame times so far (e.g. after a menu stalled the loop)
+   def reset(self):
+      self.window.clear()
+      self.window_sum = 0.0
+      self.under_frames = 0
+
+   def get_average(self):
+      if len(self.window) == 0:
+         return 0.0
+      return self.window_sum / len(self.window)
+
+   # Add the working time (ms) of a frame and step the quality if needed
+   def add_frame(self, frame_ms, frame):
+      if self.enabled == False or self.budget_ms == None:
+         return
+      if len(self.window) == self.window.maxlen:
+         self.window_sum -= self.window[0]
+      self.window.append(frame_ms)
+      self.window_sum += frame_ms
+      average = self.window_sum / len(self.window)
+
+      if average < self.budget_ms * QUALITY_UP_RATIO:
+         self.under_frames += 1
+      else:
+         self.under_frames = 0
+
+      if len(self.window) == self.window.maxlen and average > self.budget_ms * QUALITY_DOWN_RATIO:
+         if self.level < QUALITY_SIMPLE_WAVES:
+            self.set_level(self.level + 1, frame, average)
+         self.reset()
+      elif self.under_frames >= QUALITY_UP_FRAMES:
+         if self.level > QUALITY_FULL:
+            self.set_level(self.level - 1, frame, average)
+         self.reset()
+
+   def set_level(self, level, frame, average):
+      self.steps.append((frame, self.level, level, average))
+      if self.log != None:
+         self.log("Quality {} -> {} ({}) at frame {}: average {:.1f} ms, budget {:.1f} ms".format(self.level, level, QUALITY_NAMES[level], frame, average, self.budget_ms))
+      self.level = level
+      self.cloud_cnt = 0
+
+   # Whether a quality cut is in effect
+   def is_cut(self, level):
+      return self.level >= level
+
+   # Whether the next cloud should spawn
+   def allow_cloud(self):
+      self.cloud_cnt += 1
+      return self.is_cut(QUALITY_FEWER_CLOUDS) == False or (self.cloud_cnt % 2) == 1
+
+   # Get the governor counters
+   def get_stats(self):
+      return {
+         "level": self.level,
+         "steps_down": sum(1 for step in self.steps if step[2] > step[1]),
+         "steps_up": sum(1 for step in self.steps if step[2] < step[1]),
+         "average_ms": self.get_average()
+      }
@@ -0,0 +1,72 @@
+# Batched radius queries for circular area kills (Wave and Shield).
+#
+# Given the enemy centers for this frame and a list of circles, works out
+# which enemies each circle kills. Circles are resolved in order and an
+# enemy is only killed by the first circle that contains it, which matches
+# checking the circles one after another against the remaining enemies.
+#
+# With NumPy installed all squared distances are computed in one vectorized
+# operation, otherwise a plain Python loop is used.
+
+#------------------------------
+# Imports
+#------------------------------
+try:
+   import numpy  # Optional, used for the vectorized path
+except ImportError:
+   numpy = None
+
+#------------------------------
+# Functions
+#------------------------------
+
+# Get the enemy indices killed by each circle
+# - centers is a list of (x, y) enemy centers
+# - circles is a list of ((x, y), radius)
+# Returns one list of indices (in ascending order) per circle
+def radius_kills(centers, circles):
+   if numpy != None:
+      return radius_kills_numpy(centers, circles)
+   return radius_kills_scalar(centers, circles)
+
+# Pure Python fallback
+def radius_kills_scalar(centers, circles):
+   alive = [True] * len(centers)
+   kills = []
+   for (circle_x, circle_y), radius in circles:
+      radius_sq = radius * radius
+      circle_kills = []
+      i = 0
+      for center_x, center_y in centers:
+         if alive[i] == True:
+            dist_x = center_x - circle_x
+            dist_y = center_y - circle_y
+            # Compare squared distances, no need for sqrt
+            if (dist_x * dist_x) + (dist_y * dist_y) <= radius_sq:
+               circle_kills.append(i)
+               alive[i] = False
+         i += 1
+      kills.append(circle_kills)
+   return kills
+
+# Vectorized path: one (circles x enemies) distance matrix per call
+def radius_kills_numpy(centers, circles):
+   if len(centers) == 0 or len(circles) == 0:
+      return [[] for circle in circles]
+
+   enemy_pos = numpy.asarray(centers, dtype=numpy.float64)
+   circle_pos = numpy.asarray([center for center, radius in circles], dtype=numpy.float64)
+   radius = numpy.asarray([radius for center, radius in circles], dtype=numpy.float64)
+
+   # Squared distance from every circle to every enemy
+   delta = enemy_pos[numpy.newaxis, :, :] - circle_pos[:, numpy.newaxis, :]
+   dist_sq = numpy.einsum("cni,cni->cn", delta, delta)
+   inside = dist_sq <= (radius * radius)[:, numpy.newaxis]
+
+   # Each enemy belongs to the first circle that contains it
+   hit = inside.any(axis=0)
+   owner = inside.argmax(axis=0)
+   kills = []
+   for circle in range(len(circles)):
+      kills.append(numpy.flatnonzero(hit & (owner == circle)).tolist())
+   return kills
@@ -0,0 +1,98 @@
+# Z-layered render queue.
+#
+# Everything drawn in a frame is submitted to a named layer, and layers are
+# drawn back to front in a fixed order, so what ends up on top no longer
+# depends on the order sprites happened to be added to a group. All the
+# blits submitted to a layer go to the screen in one Surface.blits() call;
+# drawing that isn't a blit (e.g. circles) is submitted as a function and
+# runs after the layer's blits.
+#
+# Each layer can be turned off, and the queue counts the blits and draw
+# calls of every layer.
+
+#------------------------------
+# Imports
+#------------------------------
+import collections  # Ordered layers
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Render Layer Class
+class RenderLayer(object):
+   def __init__(self, name):
+      self.name = name
+      self.enabled = True
+      # This frame's (image, position) blits and draw functions
+      self.blits = []
+      self.draws = []
+      # Counters
+      self.blit_cnt = 0
+      self.call_cnt = 0
+      self.frame_calls = 0
+
+# Render Queue Class
+class RenderQueue(object):
+   def __init__(self, layer_names):
+      # Layers keyed by name, back to front
+      self.layers = collections.OrderedDict((name, RenderLayer(name)) for name in layer_names)
+      self.frames = 0
+
+   # Turn a layer on or off
+   def enable_layer(self, name, enabled=True):
+      self.layers[name].enabled = enabled
+
+   def is_enabled(self, name):
+      return self.layers[name].enabled
+
+   # Queue one blit on a layer
+   def submit(self, name, image, position):
+      self.layers[name].blits.append((image, position))
+
+   # Queue a sequence of (image, position) blits on a layer
+   def submit_many(self, name, blits):
+      self.layers[name].blits.extend(blits)
+
+   # Queue a draw function on a layer, called as function(surf) and
+   # returning the rect it drew (or None)
+   def draw(self, name, function):
+      self.layers[name].draws.append(function)
+
+   # Draw every enabled layer back to front and empty the queue
+   # - renderer (DirtyRenderer) draws the blits and tracks the rects
+   def flush(self, surf, renderer):
+      for layer in self.layers.values():
+         layer.frame_calls = 0
+         if layer.enabled == True:
+            if len(layer.blits) > 0:
+               renderer.blits(surf, layer.blits)
+               layer.blit_cnt += len(layer.blits)
+               layer.frame_calls += 1
+            for function in layer.draws:
+               renderer.add(function(surf))
+               layer.frame_calls += 1
+            layer.call_cnt += layer.frame_calls
+         layer.blits = []
+         layer.draws = []
+      self.frames += 1
+
+   # Reset the counters
+   def reset_stats(self):
+      for layer in self.layers.values():
+         layer.blit_cnt = 0
+         layer.call_cnt = 0
+         layer.frame_calls = 0
+      self.frames = 0
+
+   # Get the blits and draw calls of every layer, in total and on the last frame
+   def get_stats(self):
+      return {name: {"enabled": layer.enabled, "blits": layer.blit_cnt, "calls": layer.call_cnt, "frame_calls": layer.frame_calls} for name, layer in self.layers.items()}
+
+   # Get the totals as flat counters
+   def get_counters(self):
+      counters = collections.OrderedDict()
+      for name, layer in self.layers.items():
+         counters[name + "_blits"] = layer.blit_cnt
+         counters[name + "_calls"] = layer.call_cnt
+      return counters
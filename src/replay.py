@@ -0,0 +1,160 @@
+# Input recording and deterministic replay.
+#
+# A recording holds everything the simulation takes from outside: the RNG
+# seed and the keys held on every tick (spawns are scheduled on ticks from
+# the seed, so they don't need recording). Playing it back headless, one
+# tick per frame, reproduces the session exactly, and the final score and
+# health stored with it tell whether the replay still matches.
+#
+# File format (little endian, counts and values as LEB128 varints):
+#
+#   magic "RPLY", version (u8), seed (i64), ticks, final score, final health
+#   key runs:     count, then (run length, key mask) per run
+#
+# A key mask has one bit per key in REPLAY_KEYS. Held keys rarely change
+# from one tick to the next, so the run-length encoding keeps a session
+# down to a few bytes per second.
+
+#------------------------------
+# Imports
+#------------------------------
+import struct  # Header packing
+
+# Import pygame.locals for easier access to key coordinates
+from pygame.locals import (
+   K_UP,       # UP Key
+   K_DOWN,     # DOWN Key
+   K_LEFT,     # LEFT Key
+   K_RIGHT,    # RIGHT Key
+   K_SPACE,    # Space Key
+   K_w,        # W Key
+   K_s,        # S Key
+   K_a,        # A Key
+   K_d,        # D Key
+   K_KP_1,     # 1 Key
+   K_KP_2,     # 2 Key
+   K_KP_3,     # 3 Key
+   K_KP_4,     # 4 Key
+   K_1,        # 1 Key
+   K_2,        # 2 Key
+   K_3,        # 3 Key
+   K_4         # 4 Key
+)
+
+#------------------------------
+# Defines
+#------------------------------
+
+REPLAY_MAGIC = b"RPLY"
+REPLAY_VERSION = 2
+
+# Keys read by Player.update() and Shield.update(), one mask bit each
+# (new keys must only ever be added to the end)
+REPLAY_KEYS = [K_UP, K_DOWN, K_LEFT, K_RIGHT, K_SPACE, K_w, K_s, K_a, K_d,
+               K_KP_1, K_KP_2, K_KP_3, K_KP_4, K_1, K_2, K_3, K_4]
+
+# Mask bit for each key
+REPLAY_KEY_BITS = {key: 1 << bit for bit, key in enumerate(REPLAY_KEYS)}
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Pressed key state rebuilt from a key mask, indexed like pygame.key.get_pressed()
+class KeyMask(object):
+   def __init__(self, mask):
+      self.mask = mask
+
+   def __getitem__(self, key):
+      return (self.mask & REPLAY_KEY_BITS.get(key, 0)) != 0
+
+# Input Recorder Class
+class InputRecorder(object):
+   def __init__(self, seed):
+      self.seed = seed
+      self.ticks = 0
+      # Key runs as [run length, mask]
+      self.key_runs = []
+
+   # Record the keys held for the next tick
+   def add_keys(self, pressed_keys):
+      mask = pack_keys(pressed_keys)
+      if len(self.key_runs) > 0 and self.key_runs[-1][1] == mask:
+         self.key_runs[-1][0] += 1
+      else:
+         self.key_runs.append([1, mask])
+      self.ticks += 1
+
+   # Write the recording with the final game state to a file
+   def save(self, path, score, health):
+      data = bytearray(struct.pack("<4sBq", REPLAY_MAGIC, REPLAY_VERSION, self.seed))
+      for value in (self.ticks, score, health, len(self.key_runs)):
+         write_varint(data, value)
+      for run_length, mask in self.key_runs:
+         write_varint(data, run_length)
+         write_varint(data, mask)
+      with open(path, "wb") as replay_file:
+         replay_file.write(data)
+      return len(data)
+
+# Replay Class
+class Replay(object):
+   def __init__(self, path):
+      with open(path, "rb") as replay_file:
+         data = replay_file.read()
+      magic, version, self.seed = struct.unpack_from("<4sBq", data, 0)
+      if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+         raise ValueError("{} is not a version {} replay".format(path, REPLAY_VERSION))
+      pos = struct.calcsize("<4sBq")
+      self.ticks, pos = read_varint(data, pos)
+      self.score, pos = read_varint(data, pos)
+      self.health, pos = read_varint(data, pos)
+
+      # Expand the key runs to one KeyMask per tick, shared between equal masks
+      self.keys = []
+      run_count, pos = read_varint(data, pos)
+      for i in range(run_count):
+         run_length, pos = read_varint(data, pos)
+         mask, pos = read_varint(data, pos)
+         self.keys.extend([KeyMask(mask)] * run_length)
+
+   # Get the keys held on a tick (counted from 1)
+   def get_keys(self, tick):
+      if tick > len(self.keys):
+         return KeyMask(0)
+      return self.keys[tick - 1]
+
+   # Check a final game state against the recorded one
+   def matches(self, score, health):
+      return score == self.score and health == self.health
+
+#------------------------------
+# Functions
+#------------------------------
+
+# Pack a pressed key state into a key mask
+def pack_keys(pressed_keys):
+   mask = 0
+   for key, bit in REPLAY_KEY_BITS.items():
+      if pressed_keys[key]:
+         mask |= bit
+   return mask
+
+# Append an unsigned LEB128 varint
+def write_varint(data, value):
+   while value >= 0x80:
+      data.append((value & 0x7f) | 0x80)
+      value >>= 7
+   data.append(value)
+
+# Read an unsigned LEB128 varint, returns (value, next position)
+def read_varint(data, pos):
+   value = 0
+   shift = 0
+   while True:
+      byte = data[pos]
+      pos += 1
+      value |= (byte & 0x7f) << shift
+      if byte < 0x80:
+         return value, pos
+      shift += 7
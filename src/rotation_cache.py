@@ -0,0 +1,129 @@
+# Pre-rendered rotation cache.
+#
+# Sprites that turn to face where they're heading would need a
+# pygame.transform.rotate() and a new mask every frame. Instead, each frame
+# is rotated once at load time to a fixed set of quantized angles, with a
+# collision mask for every angle, and sprites pick the nearest one from
+# their velocity.
+#
+# Angles are in degrees, counter-clockwise like pygame.transform.rotate(),
+# and only cover -max_angle..+max_angle around the unrotated image. The
+# memory spent on rotated frames is capped: when the rotations at the
+# requested step would take more than the budget, the step is widened
+# until they fit.
+
+#------------------------------
+# Imports
+#------------------------------
+import math    # Heading angles
+import pygame  # Import the pygame library
+
+from pygame.locals import (
+   RLEACCEL    # Accelerated rendering parameter for non-accelerated displays
+)
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Degrees between two cached angles
+ROTATION_STEP = 5
+
+# Largest rotation either way (degrees)
+ROTATION_MAX_ANGLE = 60
+
+# Most memory (bytes) the rotated surfaces and masks may take
+ROTATION_BUDGET = 4 * 1024 * 1024
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Rotation Cache Class
+class RotationCache(object):
+   def __init__(self, cache, masks, step=ROTATION_STEP, max_angle=ROTATION_MAX_ANGLE, budget=ROTATION_BUDGET):
+      # Unrotated frames and masks are taken from the frame cache and mask registry
+      self.cache = cache
+      self.masks = masks
+      self.step = step
+      self.max_angle = max_angle
+      self.budget = budget
+      # Number of angles either side of 0
+      self.steps = 0
+      # (surfaces, masks) keyed by (image path, colorkey), indexed by angle
+      # from -max_angle to +max_angle
+      self.frames = {}
+      self.bytes = 0
+
+   # Pre-render every image in a list at all cached angles (call after the
+   # frame cache has been filled)
+   def build(self, paths, colorkey):
+      surfs = [self.cache.get(path, colorkey) for path in paths]
+
+      # Widen the step until the rotations fit in the budget
+      step = self.step
+      while step < self.max_angle and sum(get_rotation_bytes(surf, self.max_angle, step) for surf in surfs) > self.budget:
+         step *= 2
+      self.step = min(step, self.max_angle)
+      self.steps = self.max_angle // self.step
+
+      for path, surf in zip(paths, surfs):
+         rotated_surfs = []
+         rotated_masks = []
+         for i in range(-self.steps, self.steps + 1):
+            if i == 0:
+               # The unrotated frame is the shared one
+               rotated = surf
+               mask = self.masks.get(path, colorkey)
+            else:
+               # Padding is filled with the colorkey
+               rotated = pygame.transform.rotate(surf, i * self.step)
+               rotated.set_colorkey(colorkey, RLEACCEL)
+               mask = pygame.mask.from_surface(rotated)
+            rotated_surfs.append(rotated)
+            rotated_masks.append(mask)
+            self.bytes += get_surface_bytes(rotated)
+         self.frames[(path, colorkey)] = (rotated_surfs, rotated_masks)
+
+   # Get the rotated surfaces and masks of an image, indexed by get_index()
+   def get(self, path, colorkey):
+      return self.frames[(path, colorkey)]
+
+   # Get the index of the cached angle nearest to a heading
+   # - (dx, dy) is the velocity of a sprite whose image faces left
+   def get_index(self, dx, dy):
+      if dy == 0 or self.steps == 0:
+         return self.steps
+      # Moving down turns the nose down, which is counter-clockwise for a left-facing image
+      i = int(round(math.degrees(math.atan2(dy, -dx)) / self.step))
+      return min(max(i, -self.steps), self.steps) + self.steps
+
+   # Drop every rotated frame
+   def clear(self):
+      self.frames.clear()
+      self.bytes = 0
+
+   # Get the cache counters
+   def get_stats(self):
+      return {"images": len(self.frames), "angles": 2 * self.steps + 1, "step": self.step, "bytes": self.bytes}
+
+#------------------------------
+# Functions
+#------------------------------
+
+# Memory (bytes) taken by a surface and its one bit per pixel mask
+def get_surface_bytes(surf):
+   width, height = surf.get_size()
+   return width * height * surf.get_bytesize() + (width * height) // 8
+
+# Estimate the memory (bytes) of a surface's rotations, without rendering them
+def get_rotation_bytes(surf, max_angle, step):
+   width, height = surf.get_size()
+   total = 0
+   for i in range(1, (max_angle // step) + 1):
+      angle = math.radians(i * step)
+      rotated_width = abs(width * math.cos(angle)) + abs(height * math.sin(angle))
+      rotated_height = abs(width * math.sin(angle)) + abs(height * math.cos(angle))
+      # Both directions
+      total += 2 * int(rotated_width * rotated_height * (surf.get_bytesize() + 0.125))
+   return total
@@ -0,0 +1,92 @@
+# Uniform-grid spatial hash for collision broadphase.
+#
+# Sprites are bucketed into square cells by their rect once per frame. A
+# collision query only looks at sprites sharing a cell with the query rect,
+# so the (expensive) mask narrowphase only runs on nearby candidate pairs
+# instead of every bullet against every enemy.
+
+#------------------------------
+# Defines
+#------------------------------
+
+# Default cell size (pixels), roughly the size of the largest enemy
+GRID_CELL_SIZE = 64
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Spatial Hash Class
+class SpatialHash(object):
+   def __init__(self, cell_size=GRID_CELL_SIZE):
+      self.cell_size = cell_size
+      # Lists of sprites keyed by (column, row)
+      self.cells = {}
+      # Counters for the last frame
+      self.queries = 0
+      self.candidates = 0
+
+   # Get the range of cells covered by a rect
+   def cell_range(self, rect):
+      size = self.cell_size
+      return (int(rect.left // size), int((rect.right - 1) // size), int(rect.top // size), int((rect.bottom - 1) // size))
+
+   # Drop every sprite from the grid
+   def clear(self):
+      self.cells.clear()
+      self.queries = 0
+      self.candidates = 0
+
+   # Add a sprite to every cell its rect touches
+   def insert(self, sprite):
+      left, right, top, bottom = self.cell_range(sprite.rect)
+      for col in range(left, right + 1):
+         for row in range(top, bottom + 1):
+            cell = self.cells.get((col, row))
+            if cell == None:
+               self.cells[(col, row)] = [sprite]
+            else:
+               cell.append(sprite)
+
+   # Rebuild the grid from a group of sprites
+   def build(self, sprites):
+      self.clear()
+      for sprite in sprites:
+         self.insert(sprite)
+
+   # Get every sprite sharing a cell with a rect (each sprite once)
+   def query(self, rect):
+      self.queries += 1
+      left, right, top, bottom = self.cell_range(rect)
+      found = []
+      seen = set()
+      for col in range(left, right + 1):
+         for row in range(top, bottom + 1):
+            cell = self.cells.get((col, row))
+            if cell == None:
+               continue
+            for sprite in cell:
+               if sprite not in seen:
+                  seen.add(sprite)
+                  found.append(sprite)
+      self.candidates += len(found)
+      return found
+
+   # Same as pygame.sprite.spritecollide, against the sprites in the grid
+   # Sprites killed since the grid was built are skipped
+   def spritecollide(self, sprite, dokill, collided=None):
+      hits = []
+      for other in self.query(sprite.rect):
+         if other.alive() == False:
+            continue
+         if sprite.rect.colliderect(other.rect):
+            if collided == None or collided(sprite, other):
+               hits.append(other)
+      if dokill == True:
+         for other in hits:
+            other.kill()
+      return hits
+
+   # Get the grid counters
+   def get_stats(self):
+      return {"cells": len(self.cells), "queries": self.queries, "candidates": self.candidates}
@@ -0,0 +1,91 @@
+# Tick-based spawn scheduler.
+#
+# Spawns are scheduled in simulation ticks rather than on wall-clock timers,
+# so a slow frame never lets several spawns pile up and arrive together, and
+# the same seed always produces the same spawn sequence whatever the frame
+# rate. Upcoming spawns sit in a priority queue ordered by due tick; when
+# one comes due the next spawn of its kind is scheduled.
+#
+# Each kind of spawn has a base interval, an optional random jitter (from
+# the scheduler's own seeded RNG, so gameplay randomness doesn't shift spawn
+# times) and an optional difficulty ramp that shortens the interval as the
+# score grows:
+#
+#   interval = max(min_interval, base * ramp_score / (ramp_score + score))
+#
+# so the interval has halved by the time the score reaches ramp_score.
+
+#------------------------------
+# Imports
+#------------------------------
+import heapq   # Spawns ordered by due tick
+import random  # Interval jitter
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Spawn Rule Class
+class SpawnRule(object):
+   def __init__(self, kind, interval, jitter=0.0, ramp_score=0, min_interval=None):
+      if interval <= 0:
+         raise ValueError("Spawn interval must be positive: {}".format(interval))
+      self.kind = kind
+      # Base interval (ms) and random jitter as a fraction of the interval
+      self.interval = interval
+      self.jitter = jitter
+      # Difficulty ramp (0 for none) and the shortest interval it goes down to
+      # (ms), never longer than the base interval
+      self.ramp_score = ramp_score
+      if min_interval == None or min_interval > interval:
+         min_interval = interval
+      self.min_interval = min_interval
+
+   # Get the interval (ms) at a score
+   def get_interval(self, score):
+      if self.ramp_score <= 0:
+         return self.interval
+      return max(self.min_interval, self.interval * self.ramp_score / (self.ramp_score + score))
+
+# Spawn Scheduler Class
+class SpawnScheduler(object):
+   def __init__(self, tick_rate, seed=None):
+      # Ticks per second, to turn intervals into ticks
+      self.tick_rate = tick_rate
+      self.rng = random.Random(seed)
+      self.rules = {}
+      # Upcoming spawns as (due tick, order, kind), due ticks can be fractional
+      self.queue = []
+      self.order = 0
+      # Number of spawns of each kind so far
+      self.spawned = {}
+
+   # Add a kind of spawn, first due one interval after the given tick
+   def add(self, rule, tick=0, score=0):
+      self.rules[rule.kind] = rule
+      self.spawned[rule.kind] = 0
+      self.schedule(rule, tick, score)
+
+   # Queue the next spawn of a rule's kind, one (jittered) interval after a tick
+   def schedule(self, rule, tick, score):
+      interval = rule.get_interval(score)
+      if rule.jitter > 0:
+         interval *= 1 + self.rng.uniform(-rule.jitter, rule.jitter)
+      heapq.heappush(self.queue, (tick + (interval * self.tick_rate / 1000), self.order, rule.kind))
+      self.order += 1
+
+   # Remove and return the kinds due by a tick, in due order, scheduling the
+   # next spawn of each at the current score
+   def pop_due(self, tick, score):
+      due_kinds = []
+      while len(self.queue) > 0 and self.queue[0][0] <= tick:
+         due, order, kind = heapq.heappop(self.queue)
+         due_kinds.append(kind)
+         self.spawned[kind] += 1
+         # From when it was due, so fractional intervals don't drift
+         self.schedule(self.rules[kind], due, score)
+      return due_kinds
+
+   # Get the number of spawns of each kind so far
+   def get_stats(self):
+      return dict(self.spawned)
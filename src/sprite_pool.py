@@ -0,0 +1,84 @@
+# Sprite object pools.
+#
+# Short-lived sprites (bullets, enemies) are recycled instead of
+# being thrown away by kill() and rebuilt on the next spawn. A pooled sprite
+# is reset with its spawn arguments when it is acquired and goes back to its
+# pool when it is killed.
+
+#------------------------------
+# Imports
+#------------------------------
+import pygame  # Import the pygame library
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Pooled Sprite Class
+# Subclasses implement reset(*args) to put the sprite back in its spawn state
+class PooledSprite(pygame.sprite.Sprite):
+   def __init__(self):
+      super(PooledSprite, self).__init__()
+      self.pool = None
+
+   # Remove the sprite from all groups and return it to its pool
+   def kill(self):
+      # kill() can be called more than once for the same hit, only release once
+      was_alive = self.alive()
+      super(PooledSprite, self).kill()
+      if was_alive == True and self.pool != None:
+         self.pool.release(self)
+
+# Sprite Pool Class
+class SpritePool(object):
+   def __init__(self, factory, size=0):
+      # factory() builds a new sprite when the pool is empty
+      self.factory = factory
+      self.free = []
+      self.created = 0
+      self.acquired = 0
+      self.reused = 0
+      self.in_use = 0
+      self.high_water = 0
+      self.prefill(size)
+
+   # Build sprites up front so the first waves don't allocate
+   def prefill(self, size):
+      while len(self.free) < size:
+         self.free.append(self.create())
+
+   def create(self):
+      sprite = self.factory()
+      sprite.pool = self
+      self.created += 1
+      return sprite
+
+   # Get a sprite reset to its spawn state
+   def acquire(self, *args):
+      if len(self.free) > 0:
+         sprite = self.free.pop()
+         self.reused += 1
+      else:
+         sprite = self.create()
+      sprite.reset(*args)
+      self.acquired += 1
+      self.in_use += 1
+      if self.in_use > self.high_water:
+         self.high_water = self.in_use
+      return sprite
+
+   # Return a killed sprite to the pool
+   def release(self, sprite):
+      self.free.append(sprite)
+      self.in_use -= 1
+
+   # Get the pool counters
+   def get_stats(self):
+      return {
+         "created": self.created,
+         "free": len(self.free),
+         "in_use": self.in_use,
+         "high_water": self.high_water,
+         "acquired": self.acquired,
+         "reused": self.reused
+      }
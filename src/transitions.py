@@ -0,0 +1,61 @@
+# Timer-driven transitions.
+#
+# Delays between game states (game over, closing a menu...) are scheduled
+# as named timeouts instead of sleeping, so the loop that owns them keeps
+# pumping events, simulating and drawing while they're pending. The owner
+# moves the clock forward (by simulated or wall-clock time) and handles
+# whichever timeouts have come due.
+
+#------------------------------
+# Imports
+#------------------------------
+import heapq  # Timeouts ordered by due time
+
+#------------------------------
+# Classes
+#------------------------------
+
+# Transitions Class
+class Transitions(object):
+   def __init__(self, now=0):
+      # Current time (ms) and the pending timeouts as (due, order, name)
+      self.now = now
+      self.timers = []
+      self.order = 0
+
+   # Move the clock forward by a number of ms
+   def advance(self, ms):
+      self.now += ms
+
+   # Set the clock to an absolute time (ms)
+   def set_time(self, now):
+      self.now = now
+
+   # Schedule a named timeout delay ms from now
+   def schedule(self, name, delay):
+      heapq.heappush(self.timers, (self.now + delay, self.order, name))
+      self.order += 1
+
+   # Drop every pending timeout with this name
+   def cancel(self, name):
+      self.timers = [timer for timer in self.timers if timer[2] != name]
+      heapq.heapify(self.timers)
+
+   def is_pending(self, name):
+      for due, order, timer_name in self.timers:
+         if timer_name == name:
+            return True
+      return False
+
+   # Time (ms) until the next timeout is due, or None when nothing is pending
+   def time_until_next(self):
+      if len(self.timers) == 0:
+         return None
+      return max(0, self.timers[0][0] - self.now)
+
+   # Remove and return the names of the timeouts that are due, in due order
+   def pop_due(self):
+      due_names = []
+      while len(self.timers) > 0 and self.timers[0][0] <= self.now:
+         due_names.append(heapq.heappop(self.timers)[2])
+      return due_names